@@ -0,0 +1,99 @@
+import json
+import os
+import threading
+
+
+def file_stamp(path):
+    # (mtime_ns, size), or None when the file is missing
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class AssetCache:
+    """Keeps decoded files in memory until the file on disk changes.
+
+    An entry is reused as long as the file's mtime and size match the ones
+    seen when it was loaded, so re-calibrating or editing config.json takes
+    effect on the next lookup without a restart. Entries built from more
+    than one file list the others as `depends`; they are checked the same
+    way.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, path, loader, kind=None, depends=()):
+        # kind lets one file back several differently decoded entries
+        stamp = file_stamp(path)
+        if stamp is None:
+            self.invalidate(path)
+            return None
+        if depends:
+            stamp = (stamp,) + tuple(file_stamp(p) for p in depends)
+        key = (path, kind)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                return entry[1]
+        value = loader(path)
+        with self._lock:
+            self._entries[key] = (stamp, value)
+        return value
+
+    def invalidate(self, path=None):
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                for key in [key for key in self._entries if key[0] == path]:
+                    del self._entries[key]
+
+
+class Template:
+    def __init__(self, image):
+        import cv2
+
+        self.image = image
+        if image.ndim == 2:
+            self.gray = image
+            self.bgr = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        elif image.shape[2] == 4:
+            self.gray = cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY)
+            self.bgr = cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
+        else:
+            self.gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            self.bgr = image
+
+
+cache = AssetCache()
+
+def _read_template(path):
+    # cv2 is imported lazily so config loading stays cheap at startup
+    import cv2
+
+    image = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+    if image is None:
+        return None
+    return Template(image)
+
+def _read_json(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def load_template(path):
+    return cache.get(path, _read_template)
+
+def load_json(path):
+    return cache.get(path, _read_json)
+
+def load_regions(path):
+    return load_json(path)
+
+def load_config(path, defaults):
+    config = dict(defaults)
+    config.update(cache.get(path, _read_json) or {})
+    return config
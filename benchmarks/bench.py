@@ -0,0 +1,466 @@
+"""Headless benchmarks for the drop pipeline.
+
+Replays recorded inventory screenshots through the detection stages and
+click planning, with a file capture backend and the dry-run input
+recorder, and reports per-stage latency percentiles and peak memory.
+
+    python benchmarks/bench.py record NAME          # on a machine with the game
+    python benchmarks/bench.py synthesize NAME      # generated fixture
+    python benchmarks/bench.py run [--save-baseline | --compare]
+    python benchmarks/bench.py watch [--fps 5 --budget 2]
+    python benchmarks/bench.py scaling [--max-workers N --templates K]
+    python benchmarks/bench.py clicks [--action dropall --gap 0.01]
+
+A fixture is a directory under benchmarks/fixtures holding screens/*.png,
+regions_full.json, inv.png, ga.png and optionally inv_anchor.json.
+"""
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import shutil
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+BASELINE_FILE = os.path.join(BENCH_DIR, "baseline.json")
+CALIBRATION_FILES = ("regions_full.json", "regions_small.json", "inv.png", "ga.png", "inv_anchor.json")
+
+
+class Fixture:
+    def __init__(self, path):
+        import assets
+        from region_grid import RegionGrid
+        from region_utils import load_indicator_anchor
+
+        self.name = os.path.basename(path.rstrip(os.sep))
+        self.path = path
+        self.screens = sorted(glob.glob(os.path.join(path, "screens", "*.png")))
+        if not self.screens:
+            raise RuntimeError(f"{path} has no screens/*.png")
+        with open(os.path.join(path, "regions_full.json"), "r") as f:
+            self.regions = json.load(f)
+        self.grid = RegionGrid.from_regions(self.regions)
+        self.indicator = assets.load_template(os.path.join(path, "inv.png"))
+        self.ga = assets.load_template(os.path.join(path, "ga.png"))
+        self.anchor = load_indicator_anchor(os.path.join(path, "inv_anchor.json"))
+        config_file = os.path.join(path, "config.json")
+        self.config = {"threshold": 0.85}
+        if os.path.exists(config_file):
+            with open(config_file, "r") as f:
+                self.config.update(json.load(f))
+
+
+def build_stages(fixture):
+    # Each stage is a zero-argument callable; state that a real run would
+    # carry from one stage to the next is computed once up front.
+    import numpy as np
+    import staminka_dropall
+    from capture import FileBackend
+    from click_scheduler import ClickScheduler, PacingProfile, order_targets
+    from region_utils import capture_bbox, find_occupied_regions, classify_occupancy
+    from frame import FrameBuffers
+    from input_backend import RecorderInput
+
+    backend = FileBackend(os.path.join(fixture.path, "screens"))
+    full_frame = backend.grab_frame()
+    bbox = capture_bbox(fixture.grid, indicator=fixture.anchor)
+    buffers = FrameBuffers()
+    threshold = fixture.config["threshold"]
+    occupied_regions = find_occupied_regions(fixture.regions, threshold, full_frame)
+    occupied = classify_occupancy(full_frame, fixture.grid.boxes, threshold)
+    selected = np.flatnonzero(occupied)
+    rows = fixture.grid.rows[selected]
+    boxes = fixture.grid.boxes[selected]
+    scheduler = ClickScheduler(PacingProfile(min_gap=0, jitter=0), sleep=lambda seconds: None)
+    inputs = RecorderInput()
+
+    def execute_clicks():
+        inputs.clear()
+        scheduler.execute(boxes, inputs.click)
+
+    def fresh_frame():
+        # Drop cached conversions so every stage pays for its own
+        full_frame._bgr = full_frame._gray = None
+        return full_frame
+
+    return {
+        "capture_roi": lambda: backend.grab_frame(bbox, buffers),
+        "capture_full": lambda: backend.grab_frame(),
+        "check_inventory_open": lambda: staminka_dropall.check_inventory_open(
+            fresh_frame().bgr, fixture.indicator.bgr, threshold),
+        "find_indicator_anchored": lambda: staminka_dropall.find_indicator(
+            full_frame, fixture.indicator.bgr, threshold, fixture.anchor),
+        "find_occupied_regions": lambda: find_occupied_regions(fixture.regions, threshold, full_frame),
+        "search_ga_in_occupied_regions": lambda: staminka_dropall.search_ga_in_occupied_regions(
+            occupied_regions, fixture.ga.gray, full_frame),
+        "search_ga_in_grid": lambda: staminka_dropall.search_ga_in_grid(
+            occupied_regions, fixture.ga.gray, full_frame),
+        "click_planning": lambda: order_targets(boxes, "serpentine", (0, 0), rows),
+        "click_execution": execute_clicks,
+    }
+
+
+def measure(stage, repeat, warmup=3):
+    import numpy as np
+
+    for _ in range(warmup):
+        stage()
+    samples = np.empty(repeat)
+    for i in range(repeat):
+        start = time.perf_counter()
+        stage()
+        samples[i] = time.perf_counter() - start
+
+    # Separate pass so tracemalloc's overhead doesn't skew the timings
+    tracemalloc.start()
+    stage()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99]) * 1000
+    return {"p50_ms": p50, "p95_ms": p95, "p99_ms": p99, "peak_kb": peak / 1024, "runs": repeat}
+
+
+def run_fixture(fixture, repeat, stages=None):
+    results = {}
+    for name, stage in build_stages(fixture).items():
+        if stages and name not in stages:
+            continue
+        results[name] = measure(stage, repeat)
+    return results
+
+
+def print_results(fixture_name, results):
+    print(f"\n{fixture_name}")
+    print(f"  {'stage':32} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'peak KiB':>10}")
+    for stage, r in results.items():
+        print(f"  {stage:32} {r['p50_ms']:9.3f} {r['p95_ms']:9.3f} {r['p99_ms']:9.3f} {r['peak_kb']:10.1f}")
+
+
+def compare(baseline, current, tolerance):
+    # A stage regresses when its p50 or p95 is more than tolerance slower
+    regressions = []
+    for fixture_name, stages in current.items():
+        for stage, r in stages.items():
+            base = baseline.get(fixture_name, {}).get(stage)
+            if base is None:
+                continue
+            for key in ("p50_ms", "p95_ms"):
+                if r[key] > base[key] * (1 + tolerance):
+                    regressions.append(f"{fixture_name}/{stage} {key}: {base[key]:.3f} -> {r[key]:.3f}")
+    return regressions
+
+
+def command_run(args):
+    fixture_dirs = sorted(d for d in glob.glob(os.path.join(args.fixtures, "*")) if os.path.isdir(d))
+    if not fixture_dirs:
+        print(f"No fixtures in {args.fixtures}. Record or synthesize one first.")
+        return 1
+
+    current = {}
+    for path in fixture_dirs:
+        fixture = Fixture(path)
+        current[fixture.name] = run_fixture(fixture, args.repeat, args.stage)
+        print_results(fixture.name, current[fixture.name])
+    if resource is not None:
+        print(f"\nPeak RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(current, f, indent=4)
+        print(f"Baseline saved to {args.baseline}")
+    if args.compare:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, current, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print("No regressions against baseline.")
+    return 0
+
+
+def command_scaling(args):
+    # Every slot against --templates copies of the GA template, on pools of
+    # 1 to --max-workers threads with the serial fallback switched off, then
+    # once more with it on ("auto") to show which way it decides.
+    from capture import FileBackend
+    from item_detection import SLOT_PAD_TOP
+    from match_pool import MatchPool
+
+    fixture_dirs = sorted(d for d in glob.glob(os.path.join(args.fixtures, "*")) if os.path.isdir(d))
+    if not fixture_dirs:
+        print(f"No fixtures in {args.fixtures}. Record or synthesize one first.")
+        return 1
+
+    for path in fixture_dirs:
+        fixture = Fixture(path)
+        frame = FileBackend(fixture.screens[0]).grab_frame()
+        slots = [frame.crop_box(box, pad_top=SLOT_PAD_TOP) for box in fixture.grid.boxes]
+        jobs = [(slot, fixture.ga.gray) for _ in range(args.templates) for slot in slots]
+        print(f"\n{fixture.name}: {len(jobs)} match jobs, chunks of {args.chunk_size}")
+        print(f"  {'workers':>8} {'p50 ms':>9} {'p95 ms':>9} {'speedup':>8}")
+        pools = [(str(n), MatchPool(n, args.chunk_size, adaptive=False)) for n in range(1, args.max_workers + 1)]
+        pools.append(("auto", MatchPool(args.max_workers, args.chunk_size)))
+        serial = None
+        for label, pool in pools:
+            r = measure(lambda: pool.scores(jobs), args.repeat)
+            pool.close()
+            serial = serial or r["p50_ms"]
+            print(f"  {label:>8} {r['p50_ms']:9.3f} {r['p95_ms']:9.3f} {serial / r['p50_ms']:7.2f}x")
+    return 0
+
+
+def drop_clicks(fixture, action, gap, runs):
+    # Full drop runs on the fixture's first screenshot with the dry-run
+    # recorder. Returns per run (ms from start to first click, click
+    # timestamps). Runs from the fixture directory like watch_cpu.
+    import staminka_dropall
+
+    config = dict(fixture.config, input_backend="record",
+                  capture_backend="file:" + fixture.screens[0],
+                  pacing={"default": {"min_gap": gap, "jitter": 0}})
+    cwd = os.getcwd()
+    os.chdir(fixture.path)
+    results = []
+    try:
+        engine = staminka_dropall.DropEngine()
+        for i in range(runs + 1):
+            inputs = engine.get_inputs(config)
+            inputs.clear()
+            engine.invalidate_cache()
+            run = engine.metrics.start_run(action)
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                engine._run(action, config, run)
+            times = [t for t, _ in inputs.clicks()]
+            if i and times:
+                # The first run only loads assets
+                results.append(((times[0] - start) * 1000, times))
+    finally:
+        os.chdir(cwd)
+    return results
+
+
+def command_clicks(args):
+    # Time to first click and per-click overhead on top of the pacing gap,
+    # measured with the dry-run recorder, so no display is needed
+    import numpy as np
+
+    fixture_dirs = sorted(d for d in glob.glob(os.path.join(os.path.abspath(args.fixtures), "*")) if os.path.isdir(d))
+    if not fixture_dirs:
+        print(f"No fixtures in {args.fixtures}. Record or synthesize one first.")
+        return 1
+
+    for path in fixture_dirs:
+        fixture = Fixture(path)
+        results = drop_clicks(fixture, args.action, args.gap, args.runs)
+        if not results:
+            print(f"\n{fixture.name}: {args.action} clicked nothing")
+            continue
+        first = np.array([r[0] for r in results])
+        gaps = np.concatenate([np.diff(r[1]) for r in results]) * 1000
+        overhead = gaps - args.gap * 1000
+        print(f"\n{fixture.name}: {args.action}, {len(results[0][1])} clicks per run, {len(results)} runs")
+        print(f"  first click     p50 {np.percentile(first, 50):8.3f} ms  p95 {np.percentile(first, 95):8.3f} ms")
+        if len(overhead):
+            print(f"  click overhead  p50 {np.percentile(overhead, 50):8.3f} ms  "
+                  f"p95 {np.percentile(overhead, 95):8.3f} ms (over a {args.gap * 1000:g} ms gap)")
+    return 0
+
+
+def watch_cpu(fixture, backend, fps, seconds):
+    # Drives InventoryWatcher.sample on the watcher's fixed-rate schedule and
+    # returns (% of one core used, stats). Loading happens in the fixture
+    # directory because the watcher reads calibration files by name.
+    import staminka_dropall
+    from watcher import InventoryWatcher
+
+    config = dict(fixture.config, watch={"fps": fps})
+    cwd = os.getcwd()
+    os.chdir(fixture.path)
+    try:
+        watcher = InventoryWatcher(staminka_dropall.DropEngine(), backend=backend)
+        watcher.sample(config)  # load assets before measuring
+        interval = 1.0 / fps
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        next_sample = start_wall
+        while time.perf_counter() - start_wall < seconds:
+            watcher.sample(config)
+            next_sample += interval
+            time.sleep(max(0.0, next_sample - time.perf_counter()))
+        cpu = time.process_time() - start_cpu
+        wall = time.perf_counter() - start_wall
+    finally:
+        os.chdir(cwd)
+    return cpu / wall * 100, watcher.stats
+
+
+def command_watch(args):
+    # The CPU budget applies to an unchanged inventory, where every sample
+    # should be skipped by frame differencing; the changing run (a new
+    # screenshot every sample) is reported for reference.
+    from capture import FileBackend
+
+    fixture_dirs = sorted(d for d in glob.glob(os.path.join(os.path.abspath(args.fixtures), "*")) if os.path.isdir(d))
+    if not fixture_dirs:
+        print(f"No fixtures in {args.fixtures}. Record or synthesize one first.")
+        return 1
+
+    over_budget = []
+    for path in fixture_dirs:
+        fixture = Fixture(path)
+        print(f"\n{fixture.name} at {args.fps:g} FPS for {args.seconds:g} s")
+        scenarios = {
+            "static": FileBackend(fixture.screens[0]),
+            "changing": FileBackend(os.path.join(fixture.path, "screens")),
+        }
+        for scenario, backend in scenarios.items():
+            cpu, stats = watch_cpu(fixture, backend, args.fps, args.seconds)
+            print(f"  {scenario:10} {cpu:6.2f}% of one core  "
+                  f"({stats.frames} frames, {stats.skipped} skipped, {stats.analyzed} analyzed)")
+            if scenario == "static" and cpu > args.budget:
+                over_budget.append(f"{fixture.name}: {cpu:.2f}% > {args.budget:g}%")
+
+    for line in over_budget:
+        print(f"OVER BUDGET {line}")
+    if over_budget:
+        return 1
+    print(f"Watch mode within {args.budget:g}% of one core.")
+    return 0
+
+
+def command_record(args):
+    from capture import create_backend
+    import cv2
+
+    target = os.path.join(args.fixtures, args.name)
+    os.makedirs(os.path.join(target, "screens"), exist_ok=True)
+    backend = create_backend(args.backend)
+    for i in range(args.count):
+        rgb = backend.grab()
+        path = os.path.join(target, "screens", f"{int(time.time() * 1000)}_{i}.png")
+        cv2.imwrite(path, cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR))
+        time.sleep(args.interval)
+    for name in CALIBRATION_FILES + ("config.json",):
+        if os.path.exists(name):
+            shutil.copy(name, target)
+    print(f"Recorded {args.count} screenshots to {target}")
+    return 0
+
+
+def command_synthesize(args):
+    # A 1920x1080 desktop with an 11x3 grid, some filled slots, a few GA
+    # icons and the indicator patch, for machines without the game.
+    import numpy as np
+    import cv2
+
+    rng = np.random.default_rng(args.seed)
+    target = os.path.join(args.fixtures, args.name)
+    os.makedirs(os.path.join(target, "screens"), exist_ok=True)
+    x0, y0, cell = 1200, 600, 60
+    regions = []
+    for row in range(3):
+        for col in range(11):
+            regions.append({
+                "name": chr(ord('a') + row) + str(col + 1),
+                "x1": x0 + col * cell + 1, "y1": y0 + row * cell + 1,
+                "x2": x0 + (col + 1) * cell - 1, "y2": y0 + (row + 1) * cell - 1,
+            })
+    ga = rng.integers(0, 255, (20, 20, 3), dtype=np.uint8)
+    indicator = rng.integers(0, 255, (40, 120, 3), dtype=np.uint8)
+    anchor = {"x1": 1738, "y1": 561, "x2": 1858, "y2": 601}
+
+    for i in range(args.count):
+        screen = rng.integers(0, 40, (1080, 1920, 3), dtype=np.uint8)
+        filled = rng.random(len(regions)) < args.fill
+        for region, is_filled in zip(regions, filled):
+            if not is_filled:
+                continue
+            h, w = region['y2'] - region['y1'] - 10, region['x2'] - region['x1'] - 10
+            screen[region['y1'] + 5:region['y2'] - 5, region['x1'] + 5:region['x2'] - 5] = \
+                rng.integers(50, 255, (h, w, 3), dtype=np.uint8)
+            if rng.random() < 0.25:
+                screen[region['y1'] + 10:region['y1'] + 30, region['x1'] + 10:region['x1'] + 30] = ga
+        screen[anchor["y1"]:anchor["y2"], anchor["x1"]:anchor["x2"]] = indicator
+        cv2.imwrite(os.path.join(target, "screens", f"{i:03d}.png"), cv2.cvtColor(screen, cv2.COLOR_RGB2BGR))
+
+    with open(os.path.join(target, "regions_full.json"), "w") as f:
+        json.dump(regions, f, indent=4)
+    with open(os.path.join(target, "inv_anchor.json"), "w") as f:
+        json.dump(anchor, f, indent=4)
+    cv2.imwrite(os.path.join(target, "ga.png"), cv2.cvtColor(ga, cv2.COLOR_RGB2BGR))
+    cv2.imwrite(os.path.join(target, "inv.png"), cv2.cvtColor(indicator, cv2.COLOR_RGB2BGR))
+    print(f"Synthesized {args.count} screenshots to {target}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="StaminkaDrop pipeline benchmarks")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="benchmark every fixture")
+    run.add_argument("--repeat", type=int, default=200)
+    run.add_argument("--stage", action="append", help="only run this stage (repeatable)")
+    run.add_argument("--baseline", default=BASELINE_FILE)
+    run.add_argument("--save-baseline", action="store_true")
+    run.add_argument("--compare", action="store_true", help="exit 1 if a stage regressed")
+    run.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown, 0.2 = 20%%")
+    run.set_defaults(func=command_run)
+
+    scaling = commands.add_parser("scaling", help="template matching on 1..N worker threads")
+    scaling.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    scaling.add_argument("--templates", type=int, default=8)
+    scaling.add_argument("--chunk-size", type=int, default=4)
+    scaling.add_argument("--repeat", type=int, default=50)
+    scaling.set_defaults(func=command_scaling)
+
+    watch = commands.add_parser("watch", help="check watch mode CPU use against a budget")
+    watch.add_argument("--fps", type=float, default=5)
+    watch.add_argument("--seconds", type=float, default=10)
+    watch.add_argument("--budget", type=float, default=2.0, help="allowed %% of one core")
+    watch.set_defaults(func=command_watch)
+
+    clicks = commands.add_parser("clicks", help="time to first click and per-click overhead, dry run")
+    clicks.add_argument("--action", default="dropall")
+    clicks.add_argument("--gap", type=float, default=0.01, help="pacing gap between clicks in seconds")
+    clicks.add_argument("--runs", type=int, default=20)
+    clicks.set_defaults(func=command_clicks)
+
+    record = commands.add_parser("record", help="capture a fixture from the live screen")
+    record.add_argument("name")
+    record.add_argument("--count", type=int, default=5)
+    record.add_argument("--interval", type=float, default=0.5)
+    record.add_argument("--backend", default="auto")
+    record.set_defaults(func=command_record)
+
+    synthesize = commands.add_parser("synthesize", help="generate a fixture without the game")
+    synthesize.add_argument("name")
+    synthesize.add_argument("--count", type=int, default=5)
+    synthesize.add_argument("--fill", type=float, default=0.6)
+    synthesize.add_argument("--seed", type=int, default=0)
+    synthesize.set_defaults(func=command_synthesize)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+import json
+import os
+import shutil
+
+GRID_COLS = 11
+GRID_ROWS = 3
+REGION_FILE_FULL = "regions_full.json"
+REGION_FILE_SMALL = "regions_small.json"
+INDICATOR_FILE = "inv.png"
+ANCHOR_FILE = "inv_anchor.json"
+CALIBRATION_FILE = "calibrations.json"
+CALIBRATION_DIR = "calibrations"
+
+# Kept free of cv2/numpy: main.py checks the stored calibration before the
+# window is shown.
+
+
+def regions_from_rect(rect, cols=GRID_COLS, rows=GRID_ROWS):
+    # Same geometry the manual ScreenCapture selection has always produced:
+    # full slots shrunk by 2%, small slots a narrow strip near the top left.
+    left, top, right, bottom = rect
+    col_width = (right - left) / cols
+    row_height = (bottom - top) / rows
+
+    regions_full = []
+    regions_small = []
+    for row in range(rows):
+        for col in range(cols):
+            name = chr(ord('a') + row) + str(col + 1)
+            x1 = left + col * col_width
+            y1 = top + row * row_height
+            x2 = x1 + col_width
+            y2 = y1 + row_height
+
+            shrink_factor = 0.02
+            regions_full.append({
+                "name": name,
+                "x1": int(x1 + col_width * shrink_factor),
+                "y1": int(y1 + row_height * shrink_factor),
+                "x2": int(x2 - col_width * shrink_factor),
+                "y2": int(y2 - row_height * shrink_factor)
+            })
+
+            small_width = col_width * 0.15
+            small_height = row_height * 0.70
+            small_x1 = x1 + (col_width - small_width) / 4
+            small_y1 = y1 + (row_height - small_height) / 4
+            regions_small.append({
+                "name": name,
+                "x1": int(small_x1),
+                "y1": int(small_y1),
+                "x2": int(small_x1 + small_width),
+                "y2": int(small_y1 + small_height)
+            })
+    return regions_full, regions_small
+
+
+def indicator_capture_rect(rect):
+    # The patch saved as inv.png: 2.5 cells wide and tall, above the right
+    # end of the grid. Every caller that needs to know where inv.png sits
+    # goes through here.
+    left, top, right, bottom = rect
+    width = (right - left) * (2.5 / 11)
+    height = (bottom - top) * (2.5 / 11)
+    x1 = int(right - width)
+    y1 = max(0, int(top - height))
+    return (x1, y1, x1 + int(width), y1 + int(height))
+
+
+def save_indicator_anchor(rect, anchor_file=ANCHOR_FILE):
+    x1, y1, x2, y2 = (int(v) for v in rect)
+    with open(anchor_file, "w") as f:
+        json.dump({"x1": x1, "y1": y1, "x2": x2, "y2": y2}, f, indent=4)
+
+
+def calibration_key(width, height, dpi_scale=1.0, ui_scale=1.0):
+    return f"{int(width)}x{int(height)}@{float(dpi_scale):g}/ui{float(ui_scale):g}"
+
+
+def load_calibrations(path=CALIBRATION_FILE):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return {"current": None, "entries": {}}
+
+
+def save_calibrations(calibrations, path=CALIBRATION_FILE):
+    with open(path, "w") as f:
+        json.dump(calibrations, f, indent=4)
+
+
+def indicator_path(key):
+    return os.path.join(CALIBRATION_DIR, key.replace("/", "_").replace("@", "_") + ".png")
+
+
+def store_calibration(key, rect, method="manual"):
+    # Records the current calibration (rect and inv.png) under `key`
+    calibrations = load_calibrations()
+    entry = {"rect": [int(v) for v in rect], "method": method}
+    if os.path.exists(INDICATOR_FILE):
+        os.makedirs(CALIBRATION_DIR, exist_ok=True)
+        entry["indicator"] = indicator_path(key)
+        shutil.copyfile(INDICATOR_FILE, entry["indicator"])
+    calibrations.setdefault("entries", {})[key] = entry
+    calibrations["current"] = key
+    save_calibrations(calibrations)
+
+
+def write_calibration(rect):
+    # Writes the files the rest of the program reads: both region sets and
+    # the indicator anchor
+    regions_full, regions_small = regions_from_rect(rect)
+    for filename, regions in ((REGION_FILE_FULL, regions_full), (REGION_FILE_SMALL, regions_small)):
+        with open(filename, "w") as f:
+            json.dump(regions, f, indent=4)
+    save_indicator_anchor(indicator_capture_rect(rect))
+
+
+def apply_cached_calibration(key):
+    """Switches to the stored calibration for `key`. Returns False if there is none."""
+    calibrations = load_calibrations()
+    entry = calibrations.get("entries", {}).get(key)
+    if not entry:
+        return False
+    if calibrations.get("current") == key and os.path.exists(REGION_FILE_SMALL):
+        return True
+    write_calibration(entry["rect"])
+    indicator = entry.get("indicator")
+    if indicator and os.path.exists(indicator):
+        shutil.copyfile(indicator, INDICATOR_FILE)
+    calibrations["current"] = key
+    save_calibrations(calibrations)
+    print(f"Using stored calibration for {key}")
+    return True
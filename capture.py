@@ -0,0 +1,196 @@
+import glob
+import os
+import threading
+import cv2
+import numpy as np
+from frame import Frame
+
+try:
+    import mss
+except ImportError:
+    mss = None
+
+
+class CaptureBackend:
+    """Grabs an RGB image of a screen rectangle.
+
+    bbox is (x1, y1, x2, y2) in screen coordinates, or None for the whole
+    primary screen. Backends that can write into a caller-supplied array
+    use `out` when its shape matches.
+    """
+
+    name = "base"
+
+    def grab(self, bbox=None, out=None):
+        raise NotImplementedError
+
+    def grab_frame(self, bbox=None, buffers=None):
+        out = None
+        origin = (0, 0)
+        if bbox is not None:
+            origin = (bbox[0], bbox[1])
+            if buffers is not None:
+                out = buffers.get('rgb', (bbox[3] - bbox[1], bbox[2] - bbox[0], 3))
+        return Frame(self.grab(bbox, out), origin, buffers)
+
+def _into(out, image):
+    if out is not None and out.shape == image.shape:
+        np.copyto(out, image)
+        return out
+    return image.copy()
+
+
+class PyAutoGuiBackend(CaptureBackend):
+    name = "pyautogui"
+
+    def __init__(self):
+        # Imported here: pyautogui needs a display just to import
+        import pyautogui
+        self.pyautogui = pyautogui
+
+    def grab(self, bbox=None, out=None):
+        if bbox is None:
+            screenshot = self.pyautogui.screenshot()
+        else:
+            x1, y1, x2, y2 = bbox
+            screenshot = self.pyautogui.screenshot(region=(x1, y1, x2 - x1, y2 - y1))
+        if out is not None and out.shape == (screenshot.height, screenshot.width, 3):
+            # PIL still hands over its own copy, but the caller's buffer is
+            # what gets returned
+            np.copyto(out, np.asarray(screenshot))
+            return out
+        return np.array(screenshot)
+
+
+class MssBackend(CaptureBackend):
+    name = "mss"
+
+    def __init__(self):
+        if mss is None:
+            raise RuntimeError("mss is not installed")
+        # mss handles are not safe to share between threads
+        self._local = threading.local()
+
+    def _sct(self):
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            sct = self._local.sct = mss.mss()
+        return sct
+
+    def grab(self, bbox=None, out=None):
+        sct = self._sct()
+        if bbox is None:
+            monitor = sct.monitors[1]
+        else:
+            x1, y1, x2, y2 = bbox
+            monitor = {"left": x1, "top": y1, "width": x2 - x1, "height": y2 - y1}
+        shot = np.asarray(sct.grab(monitor))
+        if out is not None and out.shape[:2] != shot.shape[:2]:
+            out = None
+        return cv2.cvtColor(shot, cv2.COLOR_BGRA2RGB, dst=out)
+
+
+class QtBackend(CaptureBackend):
+    """Grabs through QScreen.grabWindow.
+
+    Qt only supports that on the GUI thread, so grabs from any other
+    thread (drop runs, the watcher) go through the auto backend instead.
+    """
+
+    name = "qt"
+
+    def __init__(self):
+        self._thread_backend = None
+        self._lock = threading.Lock()
+
+    def on_gui_thread(self):
+        from PyQt5.QtCore import QThread
+        from PyQt5.QtWidgets import QApplication
+
+        app = QApplication.instance()
+        return app is not None and QThread.currentThread() == app.thread()
+
+    def thread_backend(self):
+        with self._lock:
+            if self._thread_backend is None:
+                self._thread_backend = create_backend("auto")
+            return self._thread_backend
+
+    def grab(self, bbox=None, out=None):
+        if not self.on_gui_thread():
+            return self.thread_backend().grab(bbox, out)
+
+        from PyQt5.QtWidgets import QApplication
+        from PyQt5.QtGui import QImage
+
+        screen = QApplication.primaryScreen()
+        if not screen:
+            raise RuntimeError("No screen found")
+        if bbox is None:
+            pixmap = screen.grabWindow(0)
+        else:
+            x1, y1, x2, y2 = bbox
+            pixmap = screen.grabWindow(0, x1, y1, x2 - x1, y2 - y1)
+        image = pixmap.toImage().convertToFormat(QImage.Format_RGB888)
+        width, height = image.width(), image.height()
+        ptr = image.constBits()
+        ptr.setsize(image.byteCount())
+        rows = np.frombuffer(ptr, np.uint8).reshape(height, image.bytesPerLine())
+        return _into(out, rows[:, :width * 3].reshape(height, width, 3))
+
+
+class FileBackend(CaptureBackend):
+    """Replays screenshots from disk, cycling through them on each grab."""
+
+    name = "file"
+
+    def __init__(self, path):
+        if os.path.isdir(path):
+            self.paths = sorted(glob.glob(os.path.join(path, "*.png")))
+        else:
+            self.paths = [path]
+        if not self.paths:
+            raise RuntimeError(f"No screenshots found in {path}")
+        self.index = 0
+        self._images = {}
+
+    def _load(self, path):
+        image = self._images.get(path)
+        if image is None:
+            bgr = cv2.imread(path, cv2.IMREAD_COLOR)
+            if bgr is None:
+                raise RuntimeError(f"Could not load {path}")
+            image = self._images[path] = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+        return image
+
+    def grab(self, bbox=None, out=None):
+        image = self._load(self.paths[self.index])
+        self.index = (self.index + 1) % len(self.paths)
+        if bbox is not None:
+            x1, y1, x2, y2 = bbox
+            image = image[y1:y2, x1:x2]
+        return _into(out, image)
+
+
+BACKENDS = {
+    "pyautogui": PyAutoGuiBackend,
+    "mss": MssBackend,
+    "qt": QtBackend,
+}
+
+# Backends that grab through the QApplication of the GUI process
+GUI_BACKENDS = ("qt",)
+
+def create_backend(name="auto", gui=True):
+    # gui=False is for processes without a QApplication (the capture
+    # process); a GUI backend there is replaced by the auto choice
+    if not gui and name in GUI_BACKENDS:
+        print(f"The {name} capture backend only works in the GUI process; using auto instead.")
+        name = "auto"
+    if name == "auto":
+        return MssBackend() if mss is not None else PyAutoGuiBackend()
+    if name.startswith("file:"):
+        return FileBackend(name[len("file:"):])
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown capture backend: {name}")
+    return BACKENDS[name]()
@@ -0,0 +1,226 @@
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+import numpy as np
+
+from capture import CaptureBackend, create_backend
+from frame import Frame
+
+DEFAULT_SLOTS = 4
+DEFAULT_FPS = 30
+DEFAULT_MAX_AGE = 0.05
+
+# Header: newest sequence number, slot count, height, width
+HEADER_FIELDS = 4
+WRITING = -1
+
+
+def _attach(name):
+    try:
+        # Only the creating process should unlink the block (Python 3.13+)
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+class FrameRing:
+    """A ring of ROI frames in shared memory, one writer and any readers.
+
+    Layout: an int64 header, then per slot an int64 sequence number and a
+    float64 capture time (time.time()), then the RGB frames. The writer
+    marks a slot WRITING while it fills it and publishes the sequence
+    number last, so a reader that sees the slot's sequence unchanged after
+    it is done knows the frame was not overwritten in between.
+    """
+
+    def __init__(self, shm, owner=False):
+        self.shm = shm
+        self.owner = owner
+        buf = shm.buf
+        self.header = np.ndarray((HEADER_FIELDS,), np.int64, buf, 0)
+        slots, height, width = (int(v) for v in self.header[1:])
+        offset = self.header.nbytes
+        self.sequences = np.ndarray((slots,), np.int64, buf, offset)
+        offset += self.sequences.nbytes
+        self.timestamps = np.ndarray((slots,), np.float64, buf, offset)
+        offset += self.timestamps.nbytes
+        self.frames = np.ndarray((slots, height, width, 3), np.uint8, buf, offset)
+
+    @staticmethod
+    def size(slots, height, width):
+        return 8 * HEADER_FIELDS + 16 * slots + slots * height * width * 3
+
+    @classmethod
+    def create(cls, shape, slots=DEFAULT_SLOTS):
+        height, width = shape
+        shm = shared_memory.SharedMemory(create=True, size=cls.size(slots, height, width))
+        np.ndarray((HEADER_FIELDS,), np.int64, shm.buf, 0)[:] = (WRITING, slots, height, width)
+        ring = cls(shm, owner=True)
+        ring.sequences[:] = WRITING
+        return ring
+
+    @classmethod
+    def attach(cls, name):
+        return cls(_attach(name))
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def close(self):
+        # Views into the buffer have to go before the mapping can close
+        self.header = self.sequences = self.timestamps = self.frames = None
+        try:
+            self.shm.close()
+        except BufferError:
+            # A frame view is still referenced; the mapping goes with it
+            pass
+        if self.owner:
+            self.shm.unlink()
+
+    # Writer side
+
+    def begin(self):
+        # Returns (sequence, frame view to fill) for the next slot
+        sequence = int(self.header[0]) + 1
+        slot = sequence % len(self.sequences)
+        self.sequences[slot] = WRITING
+        return sequence, self.frames[slot]
+
+    def publish(self, sequence, timestamp):
+        slot = sequence % len(self.sequences)
+        self.timestamps[slot] = timestamp
+        self.sequences[slot] = sequence
+        self.header[0] = sequence
+
+    # Reader side
+
+    def latest(self, max_age=None):
+        """(frame view, sequence, capture time) of the newest frame, or None.
+
+        The view is zero-copy; check valid(sequence) after reading it if the
+        reader may be slower than slots / fps.
+        """
+        sequence = int(self.header[0])
+        if sequence < 0:
+            return None
+        slot = sequence % len(self.sequences)
+        timestamp = float(self.timestamps[slot])
+        if self.sequences[slot] != sequence:
+            return None
+        if max_age is not None and time.time() - timestamp > max_age:
+            return None
+        return self.frames[slot], sequence, timestamp
+
+    def valid(self, sequence):
+        return self.sequences[sequence % len(self.sequences)] == sequence
+
+
+def _capture_main(name, bbox, backend_name, fps, stop):
+    # Capture process: grab the ROI into the ring at a fixed rate until stop
+    ring = FrameRing.attach(name)
+    backend = create_backend(backend_name, gui=False)
+    interval = 1.0 / fps
+    next_grab = time.perf_counter()
+    try:
+        while not stop.is_set():
+            sequence, out = ring.begin()
+            image = backend.grab(bbox, out)
+            if image is not out:
+                # Backends that cannot write in place return their own array
+                np.copyto(out, image)
+            ring.publish(sequence, time.time())
+            next_grab += interval
+            now = time.perf_counter()
+            if next_grab < now:
+                next_grab = now
+            stop.wait(next_grab - now)
+    finally:
+        ring.close()
+
+
+class CaptureProcess:
+    """Owns the ring buffer and the process that fills it."""
+
+    def __init__(self, bbox, backend_name="auto", fps=DEFAULT_FPS, slots=DEFAULT_SLOTS):
+        self.bbox = tuple(int(v) for v in bbox)
+        x1, y1, x2, y2 = self.bbox
+        self.ring = FrameRing.create((y2 - y1, x2 - x1), slots)
+        self._stop = multiprocessing.Event()
+        self.process = multiprocessing.Process(
+            target=_capture_main, args=(self.ring.name, self.bbox, backend_name, fps, self._stop),
+            name="capture", daemon=True,
+        )
+        self.process.start()
+
+    @property
+    def alive(self):
+        return self.process.is_alive()
+
+    def stop(self):
+        self._stop.set()
+        self.process.join(timeout=2)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.ring.close()
+
+
+class SharedFrameBackend(CaptureBackend):
+    """Serves grabs from the capture process's newest frame.
+
+    A grab whose bbox lies inside the captured ROI gets a zero-copy view of
+    the newest frame when it is at most max_age seconds old; anything else
+    (no fresh frame yet, process gone, bbox outside the ROI) falls back to
+    grabbing directly with `fallback`. The writer reuses the view's slot
+    after slots / fps seconds, so frames carry a source_valid check for
+    Frame.convert.
+    """
+
+    name = "shared"
+
+    def __init__(self, capture, fallback, max_age=DEFAULT_MAX_AGE):
+        self.capture = capture
+        self.fallback = fallback
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.overwritten = 0
+
+    def _view(self, bbox):
+        # (view, sequence) or None
+        if bbox is None or not self.capture.alive:
+            return None
+        x1, y1, x2, y2 = self.capture.bbox
+        if bbox[0] < x1 or bbox[1] < y1 or bbox[2] > x2 or bbox[3] > y2:
+            return None
+        latest = self.capture.ring.latest(self.max_age)
+        if latest is None:
+            return None
+        frame, sequence, _ = latest
+        return frame[bbox[1] - y1:bbox[3] - y1, bbox[0] - x1:bbox[2] - x1], sequence
+
+    def grab(self, bbox=None, out=None):
+        latest = self._view(bbox)
+        if latest is None:
+            return self.fallback.grab(bbox, out)
+        view, sequence = latest
+        if out is not None and out.shape == view.shape:
+            np.copyto(out, view)
+            image = out
+        else:
+            image = view.copy()
+        if not self.capture.ring.valid(sequence):
+            # The slot was rewritten while copying
+            self.overwritten += 1
+            return self.fallback.grab(bbox, out)
+        return image
+
+    def grab_frame(self, bbox=None, buffers=None):
+        latest = self._view(bbox)
+        if latest is None:
+            self.misses += 1
+            return self.fallback.grab_frame(bbox, buffers)
+        self.hits += 1
+        view, sequence = latest
+        ring = self.capture.ring
+        return Frame(view, (bbox[0], bbox[1]), buffers, lambda: ring.valid(sequence))
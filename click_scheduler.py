@@ -0,0 +1,137 @@
+import random
+import time
+import numpy as np
+
+
+class PacingProfile:
+    """Delay policy between clicks of one action.
+
+    Each click is scheduled min_gap + uniform(0, jitter) seconds after the
+    previous one, measured from when the previous click was issued, and
+    every burst_size clicks an extra burst_pause is added (0 disables
+    bursts).
+    """
+
+    SETTINGS = ('min_gap', 'jitter', 'burst_size', 'burst_pause')
+
+    def __init__(self, min_gap=0.1, jitter=0.05, burst_size=0, burst_pause=0.0):
+        self.min_gap = min_gap
+        self.jitter = jitter
+        self.burst_size = burst_size
+        self.burst_pause = burst_pause
+
+    @classmethod
+    def from_config(cls, config, action):
+        # config["pacing"] = {"default": {...}, "<action>": {...}}
+        pacing = config.get('pacing', {})
+        settings = dict(pacing.get('default', {}))
+        settings.update(pacing.get(action, {}))
+        unknown = sorted(set(settings) - set(cls.SETTINGS))
+        if unknown:
+            # A typo in config.json shouldn't stop the run
+            print(f"Warning: Ignoring unknown pacing setting(s) for '{action}': {', '.join(unknown)}. "
+                  f"Known settings: {', '.join(cls.SETTINGS)}")
+        return cls(**{key: value for key, value in settings.items() if key in cls.SETTINGS})
+
+
+def box_centers(boxes):
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    return np.stack([(boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2], axis=1)
+
+def row_ids(boxes):
+    # Cluster boxes into rows: a new row starts wherever consecutive centre
+    # heights jump by more than half the median box height.
+    boxes = np.asarray(boxes).reshape(-1, 4)
+    centers_y = box_centers(boxes)[:, 1]
+    order = np.argsort(centers_y, kind='stable')
+    tolerance = np.median(boxes[:, 3] - boxes[:, 1]) / 2
+    breaks = np.concatenate([[0], np.diff(centers_y[order]) > tolerance]).astype(np.int32)
+    rows = np.empty(len(boxes), dtype=np.int32)
+    rows[order] = np.cumsum(breaks)
+    return rows
+
+def serpentine_order(boxes, rows=None):
+    # Row by row, alternating the x direction so the cursor never travels
+    # back across a whole row. Returns indices into boxes.
+    if len(boxes) == 0:
+        return np.zeros(0, dtype=np.intp)
+    if rows is None:
+        rows = row_ids(boxes)
+    rows = np.asarray(rows)
+    _, rank = np.unique(rows, return_inverse=True)
+    centers_x = box_centers(boxes)[:, 0]
+    return np.lexsort((np.where(rank % 2 == 1, -centers_x, centers_x), rank))
+
+def nearest_neighbour_order(boxes, start=None):
+    centers = box_centers(boxes)
+    remaining = np.ones(len(centers), dtype=bool)
+    order = np.empty(len(centers), dtype=np.intp)
+    position = None if start is None else np.asarray(start, dtype=np.float64)
+    for step in range(len(centers)):
+        candidates = np.flatnonzero(remaining)
+        if position is None:
+            index = candidates[0]
+        else:
+            distances = np.hypot(*(centers[candidates] - position).T)
+            index = candidates[np.argmin(distances)]
+        order[step] = index
+        remaining[index] = False
+        position = centers[index]
+    return order
+
+def order_targets(boxes, strategy="serpentine", start=None, rows=None):
+    if strategy == "serpentine":
+        return serpentine_order(boxes, rows)
+    if strategy == "nearest":
+        return nearest_neighbour_order(boxes, start)
+    return np.arange(len(boxes))
+
+
+class ClickStats:
+    def __init__(self, clicks, elapsed):
+        self.clicks = clicks
+        self.elapsed = elapsed
+
+    @property
+    def clicks_per_second(self):
+        return self.clicks / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class ClickScheduler:
+    def __init__(self, profile=None, rng=None, clock=time.perf_counter, sleep=time.sleep):
+        self.profile = profile or PacingProfile()
+        self.rng = rng or random.Random()
+        self.clock = clock
+        self.sleep = sleep
+
+    def click_point(self, box):
+        x1, y1, x2, y2 = (int(v) for v in box)
+        return self.rng.randint(x1, x2), self.rng.randint(y1, y2)
+
+    def next_gap(self, clicks_done):
+        profile = self.profile
+        gap = profile.min_gap + self.rng.uniform(0, profile.jitter)
+        if profile.burst_size and clicks_done % profile.burst_size == 0:
+            gap += profile.burst_pause
+        return gap
+
+    def execute(self, targets, click, should_stop=None, on_click=None):
+        # targets are x1, y1, x2, y2 boxes in click order; click(x, y) issues
+        # one click; should_stop() is polled between clicks and
+        # on_click(done, total) is called after each one
+        start = self.clock()
+        due = start
+        clicks = 0
+        for box in targets:
+            if should_stop is not None and should_stop():
+                break
+            wait = due - self.clock()
+            if wait > 0:
+                self.sleep(wait)
+            issued = self.clock()
+            click(*self.click_point(box))
+            clicks += 1
+            if on_click is not None:
+                on_click(clicks, len(targets))
+            due = issued + self.next_gap(clicks)
+        return ClickStats(clicks, self.clock() - start)
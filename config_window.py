@@ -1,15 +1,16 @@
 import json
-import os
-import requests
+import threading
+import time
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QLabel, QSlider, QMenu, QAction
 )
-from PyQt5.QtCore import Qt, QPoint, pyqtSignal
+from PyQt5.QtCore import Qt, QPoint, QTimer, pyqtSignal
 from PyQt5.QtGui import QKeySequence, QCursor
 import keyboard
 
-import staminka_dropall
+import assets
+from drop_dispatcher import DropDispatcher
 from region_visualizer import RegionVisualizer  # Import the new visualizer class
 
 CONFIG_FILE = "config.json"
@@ -17,27 +18,39 @@ LOCAL_VERSION = "0.0.1"
 REMOTE_VERSION_URL = "todo"
 
 def check_version():
-    
+    # Stub. When implemented, import requests in here so the network stack
+    # is only loaded when a check actually runs.
     pass
 
+def load_drop_engine():
+    # staminka_dropall pulls in cv2, numpy, pyautogui and rich, so it is
+    # imported on first use (or by warm_up) rather than at startup.
+    import staminka_dropall
+    return staminka_dropall.DropEngine()
+
+def load_watcher(engine, on_event, on_action):
+    from watcher import InventoryWatcher
+    return InventoryWatcher(engine, on_event=on_event, on_action=on_action)
+
+def warm_up(report=False):
+    start = time.perf_counter()
+    import staminka_dropall  # noqa: F401
+    if report:
+        print(f"Background warm-up finished in {time.perf_counter() - start:.3f} seconds")
+
 def load_config():
     default_config = {
         "keybind": "ctrl+shift+d",
         "inventory_key": "i",
         "threshold": 0.89,
-        "menu_keybind": "ctrl+d"
+        "menu_keybind": "ctrl+d",
+        "cancel_keybind": "ctrl+shift+x"
     }
-    if os.path.exists(CONFIG_FILE):
-        try:
-            with open(CONFIG_FILE, "r") as f:
-                config = json.load(f)
-                # Ensure all keys are present
-                for key in default_config:
-                    if key not in config:
-                        config[key] = default_config[key]
-                return config
-        except json.JSONDecodeError:
-            print("Error decoding JSON config. Using default configuration.")
+    try:
+        # Missing keys are filled in from the defaults
+        return assets.load_config(CONFIG_FILE, default_config)
+    except json.JSONDecodeError:
+        print("Error decoding JSON config. Using default configuration.")
     return default_config
 
 def save_config(config_data):
@@ -165,15 +178,25 @@ class KeybindButton(QPushButton):
 
 class ConfigWindow(QWidget):
     show_menu_signal = pyqtSignal()
+    watch_event_signal = pyqtSignal(str)
 
-    def __init__(self):
+    def __init__(self, warm_up_report=False):
         super().__init__()
         self.dragging = False
         self.offset = None
         self.hotkeys_registered = {}  # Dictionary to manage multiple hotkeys
+        self.engine = None
+        self.dispatcher = None
+        self.watcher = None
+        self.capture_stopper = None
         self.config_data = load_config()
         self.initUI()
+        # Load the vision and input stacks once the window has painted
+        QTimer.singleShot(0, lambda: threading.Thread(
+            target=warm_up, args=(warm_up_report,), name="warm-up", daemon=True
+        ).start())
         self.show_menu_signal.connect(self.show_menu_main_thread)  # Connect the signal
+        self.watch_event_signal.connect(self.status_label.setText)
 
     def initUI(self):
         self.setWindowTitle("StaminkaDrop")
@@ -227,6 +250,18 @@ class ConfigWindow(QWidget):
         self.start_button.clicked.connect(self.start_program)
         layout.addWidget(self.start_button)
 
+        self.cancel_button = QPushButton("Cancel Drop")
+        self.cancel_button.clicked.connect(self.cancel_drop)
+        self.cancel_button.setEnabled(False)
+        layout.addWidget(self.cancel_button)
+
+        self.status_label = QLabel("Idle")
+        layout.addWidget(self.status_label)
+
+        self.metrics_label = QLabel("")
+        self.metrics_label.setStyleSheet("font-family: monospace;")
+        layout.addWidget(self.metrics_label)
+
         remote_version = check_version()
         version_text = (
             f"Version: {LOCAL_VERSION}" if not remote_version
@@ -248,6 +283,8 @@ class ConfigWindow(QWidget):
     def update_threshold(self, value):
         self.config_data["threshold"] = value / 100.0
         self.current_threshold_label.setText(f"Current Threshold: {self.config_data['threshold']:.2f}")
+        if self.engine is not None:
+            self.engine.invalidate_cache()
 
     def start_program(self):
         self.config_data["keybind"] = self.keybind_button.current_keybind
@@ -260,6 +297,13 @@ class ConfigWindow(QWidget):
             self.inventory_keybind_button.setEnabled(False)
             self.menu_keybind_button.setEnabled(False)
             self.start_button.setText("Stop")
+            if self.engine is None:
+                self.engine = load_drop_engine()
+                self.dispatcher = DropDispatcher(self.engine)
+                self.dispatcher.run_started.connect(self.on_run_started)
+                self.dispatcher.run_progress.connect(self.on_run_progress)
+                self.dispatcher.run_finished.connect(self.on_run_finished)
+                self.dispatcher.press_dropped.connect(self.on_press_dropped)
             # Register hotkeys
             self.hotkeys_registered["dropall"] = keyboard.add_hotkey(
                 self.config_data["keybind"], self.run_staminka_dropall
@@ -267,10 +311,29 @@ class ConfigWindow(QWidget):
             self.hotkeys_registered["menu"] = keyboard.add_hotkey(
                 self.config_data["menu_keybind"], self.show_menu
             )
+            self.hotkeys_registered["cancel"] = keyboard.add_hotkey(
+                self.config_data["cancel_keybind"], self.cancel_drop
+            )
+            if self.config_data.get("capture_process", False):
+                self.engine.start_capture()
+            if self.config_data.get("watch", {}).get("enabled", False):
+                if self.watcher is None:
+                    # Bound actions go through the dispatcher like hotkey presses
+                    self.watcher = load_watcher(self.engine, self.on_watch_event, self.dispatcher.submit)
+                self.watcher.reset()
+                self.watcher.start()
         else:
             self.stop_program()
 
     def stop_program(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+        if self.dispatcher is not None:
+            self.dispatcher.cancel()
+        if self.engine is not None:
+            # Stopping the capture waits for the cancelled run to let go of
+            # the engine, so it happens off the GUI thread
+            self.capture_stopper = self.engine.stop_capture(wait=False)
         if self.hotkeys_registered:
             for hotkey in self.hotkeys_registered.values():
                 keyboard.remove_hotkey(hotkey)
@@ -281,8 +344,40 @@ class ConfigWindow(QWidget):
         self.start_button.setText("Start")
 
     def run_staminka_dropall(self):
-        print("Keybind activated, running staminka_dropall.main('dropall')")
-        staminka_dropall.main(action="dropall")
+        # Called on the keyboard hook thread; hand off to the worker
+        print("Keybind activated, queueing 'dropall'")
+        self.dispatcher.submit("dropall")
+
+    def on_watch_event(self, event):
+        # Called on the watch thread
+        self.watch_event_signal.emit(f"Watch: {event.kind} {event.value if event.value is not None else ''}")
+
+    def cancel_drop(self):
+        if self.dispatcher is not None:
+            self.dispatcher.cancel()
+
+    def on_run_started(self, action):
+        self.cancel_button.setEnabled(True)
+        self.status_label.setText(f"Running {action}...")
+
+    def on_run_progress(self, action, done, total):
+        self.status_label.setText(f"Running {action}: {done}/{total}")
+
+    def on_run_finished(self, action, outcome):
+        self.cancel_button.setEnabled(False)
+        self.status_label.setText(f"{action}: {outcome}")
+        self.update_metrics_label()
+
+    def on_press_dropped(self, action):
+        # A queued press replaced by a newer one, or skipped by Cancel
+        self.status_label.setText(f"{action} skipped")
+
+    def update_metrics_label(self):
+        # p50 / p95 over the engine's rolling window, in milliseconds
+        summary = self.engine.metrics.summary()
+        self.metrics_label.setText("\n".join(
+            f"{stage:<17}{p50:8.1f}{p95:8.1f} ms" for stage, (p50, p95, _) in summary.items()
+        ))
 
     def show_menu(self):
         # Emit the signal to show the menu in the main thread
@@ -299,27 +394,39 @@ class ConfigWindow(QWidget):
         self.menu = QMenu()
 
         action_dropall = QAction("Drop All", self)
-        action_dropall.triggered.connect(lambda: staminka_dropall.main(action="dropall"))
+        action_dropall.triggered.connect(lambda: self.dispatcher.submit("dropall"))
         self.menu.addAction(action_dropall)
 
         action_dropallexceptga = QAction("Drop All Except GA", self)
-        action_dropallexceptga.triggered.connect(lambda: staminka_dropall.main(action="dropallexceptga"))
+        action_dropallexceptga.triggered.connect(lambda: self.dispatcher.submit("dropallexceptga"))
         self.menu.addAction(action_dropallexceptga)
 
         action_dropgaonly = QAction("Drop GA Only", self)
-        action_dropgaonly.triggered.connect(lambda: staminka_dropall.main(action="dropgaonly"))
+        action_dropgaonly.triggered.connect(lambda: self.dispatcher.submit("dropgaonly"))
         self.menu.addAction(action_dropgaonly)
 
         # Show the menu at the adjusted position
         self.menu.exec_(menu_pos)
 
     def show_regions(self):
-        # Create an instance of RegionVisualizer
-        self.region_visualizer = RegionVisualizer()
+        # A second press closes a live overlay, which does not take keyboard
+        # focus and so cannot be closed with ESC
+        visualizer = getattr(self, 'region_visualizer', None)
+        if visualizer is not None and visualizer.isVisible():
+            visualizer.close()
+            self.region_visualizer = None
+            return
+        # Live overlay of the engine's results once the program has started
+        self.region_visualizer = RegionVisualizer(self.engine)
         self.region_visualizer.show()
 
     def exit_program(self):
         self.stop_program()
+        if self.dispatcher is not None:
+            self.dispatcher.close()
+        if self.capture_stopper is not None:
+            # Lets the capture process unlink its shared memory
+            self.capture_stopper.join(timeout=2.0)
         QApplication.quit()
 
     def mousePressEvent(self, event):
@@ -0,0 +1,87 @@
+import threading
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from staminka_dropall import FAILED
+
+
+class DropDispatcher(QObject):
+    """Runs drop actions one at a time on a dedicated worker thread.
+
+    submit() never blocks, so it is safe to call from the keyboard hook
+    thread or the GUI thread. Presses that arrive while a run is in
+    progress are coalesced into a single queued run (latest action wins),
+    or dropped when coalesce is False. Signals are delivered to the GUI
+    thread through Qt's queued connections; run_finished carries the
+    outcome DropEngine.run returned.
+    """
+
+    run_started = pyqtSignal(str)
+    run_progress = pyqtSignal(str, int, int)
+    run_finished = pyqtSignal(str, str)
+    press_dropped = pyqtSignal(str)
+
+    def __init__(self, engine, coalesce=True):
+        super().__init__()
+        self.engine = engine
+        self.coalesce = coalesce
+        self._condition = threading.Condition()
+        self._cancel = threading.Event()
+        self._pending = None
+        self._busy = False
+        self._closed = False
+        self._thread = threading.Thread(target=self._worker, name="drop-worker", daemon=True)
+        self._thread.start()
+
+    @property
+    def busy(self):
+        return self._busy
+
+    def submit(self, action):
+        with self._condition:
+            if self._busy and not self.coalesce:
+                self.press_dropped.emit(action)
+                return
+            if self._pending is not None:
+                self.press_dropped.emit(self._pending)
+            self._pending = action
+            self._condition.notify()
+
+    def cancel(self):
+        with self._condition:
+            if self._pending is not None:
+                self.press_dropped.emit(self._pending)
+                self._pending = None
+        self._cancel.set()
+
+    def close(self):
+        self.cancel()
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+
+    def _worker(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                action = self._pending
+                self._pending = None
+                self._busy = True
+                self._cancel.clear()
+
+            self.run_started.emit(action)
+            outcome = FAILED
+            try:
+                outcome = self.engine.run(
+                    action,
+                    should_stop=self._cancel.is_set,
+                    on_progress=lambda done, total: self.run_progress.emit(action, done, total),
+                )
+            except Exception as e:
+                print(f"Drop run '{action}' failed: {e}")
+            finally:
+                with self._condition:
+                    self._busy = False
+            self.run_finished.emit(action, outcome)
@@ -0,0 +1,93 @@
+import cv2
+import numpy as np
+
+
+class FrameBuffers:
+    """Output arrays reused across captures so steady-state runs don't allocate.
+
+    A Frame built on these buffers is only valid until the next frame is
+    built on the same buffers.
+    """
+
+    def __init__(self):
+        self._arrays = {}
+
+    def get(self, key, shape, dtype=np.uint8):
+        array = self._arrays.get(key)
+        if array is None or array.shape != shape or array.dtype != dtype:
+            array = self._arrays[key] = np.empty(shape, dtype)
+        return array
+
+    def clear(self):
+        self._arrays.clear()
+
+
+class Frame:
+    """A single screen capture shared by every stage of a drop run.
+
+    Color conversions are computed on first use and cached, and slot crops
+    are returned as views into the cached arrays rather than copies.
+
+    `source_valid`, if given, reports whether `rgb` still holds the pixels
+    it was grabbed with; frames viewing a reused buffer (the capture ring)
+    check it once their conversions are cached.
+    """
+
+    def __init__(self, rgb, origin=(0, 0), buffers=None, source_valid=None):
+        self.rgb = rgb
+        self.origin = origin
+        self.buffers = buffers
+        self.source_valid = source_valid
+        self._bgr = None
+        self._gray = None
+
+    @classmethod
+    def grab(cls):
+        # Imported here: pyautogui needs a display just to import
+        import pyautogui
+        return cls(np.array(pyautogui.screenshot()))
+
+    @property
+    def shape(self):
+        return self.rgb.shape
+
+    def buffer(self, key, shape, dtype=np.uint8):
+        if self.buffers is None:
+            return np.empty(shape, dtype)
+        return self.buffers.get(key, shape, dtype)
+
+    def convert(self):
+        # Caches both conversions, after which rgb is no longer read.
+        # Returns whether they were made from an intact source.
+        self.bgr
+        self.gray
+        return self.source_valid is None or self.source_valid()
+
+    @property
+    def bgr(self):
+        if self._bgr is None:
+            dst = self.buffer('bgr', self.rgb.shape)
+            self._bgr = cv2.cvtColor(self.rgb, cv2.COLOR_RGB2BGR, dst=dst)
+        return self._bgr
+
+    @property
+    def gray(self):
+        if self._gray is None:
+            # BGR2GRAY on RGB data is the weighting the occupancy and GA
+            # thresholds were tuned against, so keep it.
+            dst = self.buffer('gray', self.rgb.shape[:2])
+            self._gray = cv2.cvtColor(self.rgb, cv2.COLOR_BGR2GRAY, dst=dst)
+        return self._gray
+
+    def crop(self, region, image=None, pad_top=0):
+        return self.crop_box((region['x1'], region['y1'], region['x2'], region['y2']), image, pad_top)
+
+    def crop_box(self, box, image=None, pad_top=0):
+        if image is None:
+            image = self.gray
+        ox, oy = self.origin
+        x1 = max(0, int(box[0]) - ox)
+        y1 = max(0, int(box[1]) - pad_top - oy)
+        x2 = max(0, int(box[2]) - ox)
+        y2 = max(0, int(box[3]) - oy)
+        return image[y1:y2, x1:x2]
@@ -0,0 +1,137 @@
+import cv2
+import numpy as np
+from calibration import (
+    GRID_COLS, GRID_ROWS, INDICATOR_FILE, indicator_capture_rect, store_calibration, write_calibration
+)
+
+MIN_CELL = 16
+LINE_TOLERANCE = 6
+
+
+def _line_positions(segments, axis):
+    # Collapse segment coordinates that are within LINE_TOLERANCE of each
+    # other (both edges of a drawn border) into one weighted position.
+    if len(segments) == 0:
+        return np.empty(0), np.empty(0)
+    coords = (segments[:, axis] + segments[:, axis + 2]) / 2.0
+    lengths = np.abs(segments[:, 3 - axis] - segments[:, 1 - axis]).astype(np.float64) + 1
+    order = np.argsort(coords)
+    coords, lengths = coords[order], lengths[order]
+    breaks = np.flatnonzero(np.diff(coords) > LINE_TOLERANCE) + 1
+    groups = np.split(np.arange(len(coords)), breaks)
+    positions = np.array([np.average(coords[g], weights=lengths[g]) for g in groups])
+    weights = np.array([lengths[g].sum() for g in groups])
+    return positions, weights
+
+
+def _progressions(positions, weights, count, min_step, max_step, max_missing=1, limit=5):
+    # Finds sets of `count` evenly spaced lines among the candidates. Every
+    # pair of candidates, taken as the first line and the k-th line after
+    # it, proposes a spacing; proposals with both outer lines and at most
+    # `max_missing` inner ones missing are ranked by edge length. Using the
+    # far pairs keeps rounding in the border positions from adding up.
+    found = {}
+    steps = np.arange(count)
+    for i in range(len(positions)):
+        spacing = ((positions[i + 1:] - positions[i])[:, None] / steps[None, 1:]).ravel()
+        spacing = spacing[(spacing >= min_step) & (spacing <= max_step)]
+        if not len(spacing):
+            continue
+        expected = positions[i] + spacing[:, None] * steps[None, :]
+        nearest = np.clip(np.searchsorted(positions, expected), 1, len(positions) - 1)
+        left = positions[nearest - 1]
+        right = positions[nearest]
+        pick = np.where(np.abs(expected - left) <= np.abs(expected - right), nearest - 1, nearest)
+        tolerance = np.maximum(LINE_TOLERANCE, spacing * 0.05)[:, None]
+        hit = np.abs(positions[pick] - expected) <= tolerance
+        usable = hit[:, 0] & hit[:, -1] & (hit.sum(axis=1) >= count - max_missing)
+        for j in np.flatnonzero(usable):
+            lines = tuple(np.where(hit[j], pick[j], -1))
+            if lines not in found:
+                found[lines] = weights[pick[j][hit[j]]].sum()
+    ranked = sorted(found, key=found.get, reverse=True)[:limit]
+    return [_fit_lines(positions, np.array(lines)) for lines in ranked]
+
+
+def _fit_lines(positions, lines):
+    # Least-squares evenly spaced fit over the lines that were found, so a
+    # border hidden or thrown off by a nearby edge does not move the grid
+    steps = np.arange(len(lines))
+    present = lines >= 0
+    spacing, first = np.polyfit(steps[present], positions[lines[present]], 1)
+    return first + spacing * steps
+
+
+def _line_coverage(edges, columns, rows):
+    # Fraction of the grid's border pixels that lie on an edge
+    x = np.round(columns).astype(np.intp)
+    y = np.round(rows).astype(np.intp)
+    ys = np.arange(y[0], y[-1] + 1)
+    xs = np.arange(x[0], x[-1] + 1)
+    hits = edges[ys[:, None], x[None, :]].astype(bool).sum() + edges[y[:, None], xs[None, :]].astype(bool).sum()
+    return hits / float(len(ys) * len(x) + len(xs) * len(y))
+
+
+def detect_grid(gray, cols=GRID_COLS, rows=GRID_ROWS):
+    """Finds the inventory grid in a grayscale frame.
+
+    Returns the (x1, y1, x2, y2) outline of the cols x rows slot grid in
+    frame coordinates, or None when no evenly spaced set of slot borders
+    is visible (e.g. the inventory is closed).
+    """
+    height, width = gray.shape[:2]
+    edges = cv2.Canny(gray, 50, 150)
+    segments = cv2.HoughLinesP(edges, 1, np.pi / 180, threshold=MIN_CELL,
+                               minLineLength=MIN_CELL, maxLineGap=4)
+    if segments is None:
+        return None
+    segments = segments.reshape(-1, 4)
+    dx = np.abs(segments[:, 2] - segments[:, 0])
+    dy = np.abs(segments[:, 3] - segments[:, 1])
+    vertical = segments[(dx <= 1) & (dy > dx)]
+    horizontal = segments[(dy <= 1) & (dx > dy)]
+    xs, x_weights = _line_positions(vertical, 0)
+
+    # Borders are a few pixels wide, so score candidates on thickened edges
+    thick = cv2.dilate(edges, np.ones((LINE_TOLERANCE, LINE_TOLERANCE), np.uint8))
+    best = None
+    best_coverage = 0.0
+    for columns in _progressions(xs, x_weights, cols + 1, MIN_CELL, width / cols):
+        left, right = columns[0], columns[-1]
+        cell = (right - left) / cols
+        # Only horizontal borders within these columns; Hough splits long
+        # borders into pieces, so any overlap counts
+        x_lo = np.minimum(horizontal[:, 0], horizontal[:, 2])
+        x_hi = np.maximum(horizontal[:, 0], horizontal[:, 2])
+        within = horizontal[np.minimum(x_hi, right) - np.maximum(x_lo, left) > 0]
+        ys, y_weights = _line_positions(within, 1)
+        for grid_rows in _progressions(ys, y_weights, rows + 1, cell * 0.6, cell * 1.6):
+            if left < 0 or grid_rows[0] < 0 or right >= width or grid_rows[-1] >= height:
+                continue
+            coverage = _line_coverage(thick, columns, grid_rows)
+            if coverage > best_coverage:
+                best_coverage = coverage
+                best = (left, grid_rows[0], right, grid_rows[-1])
+    if best is None:
+        return None
+    return tuple(int(round(v)) for v in best)
+
+
+def auto_calibrate(frame, key, confirm=None):
+    """Detects the grid in a full-screen frame and stores it under `key`.
+
+    confirm(rect), if given, is shown the detected outline before anything
+    is written and can reject it. Returns the grid outline, or None if no
+    grid was found or it was rejected.
+    """
+    rect = detect_grid(frame.gray)
+    if rect is None:
+        return None
+    if confirm is not None and not confirm(rect):
+        print(f"Detected inventory grid at {rect} rejected")
+        return None
+    write_calibration(rect)
+    cv2.imwrite(INDICATOR_FILE, frame.crop_box(indicator_capture_rect(rect), frame.bgr))
+    store_calibration(key, rect, method="auto")
+    print(f"Detected inventory grid at {rect}, saved as {key}")
+    return rect
@@ -0,0 +1,389 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    from Xlib import X, XK, display as xdisplay
+    from Xlib.ext import xtest
+except ImportError:
+    xtest = None
+
+
+# Alternative spellings of key names, as produced by the keybind buttons
+# (Qt's key text and their own fallback names) and by pyautogui, mapped to
+# the canonical names the key tables below use
+KEY_ALIASES = {
+    "control": "ctrl", "meta": "cmd", "win": "cmd", "super": "cmd", "command": "cmd", "windows": "cmd",
+    "return": "enter", "escape": "esc", "spacebar": "space", "back": "backspace",
+    "ins": "insert", "del": "delete",
+    "pgup": "page_up", "pageup": "page_up", "page up": "page_up",
+    "pgdown": "page_down", "pgdn": "page_down", "pagedown": "page_down", "page down": "page_down",
+    "capslock": "caps_lock", "caps lock": "caps_lock",
+    "numlock": "num_lock", "num lock": "num_lock",
+    "scrolllock": "scroll_lock", "scroll lock": "scroll_lock",
+    "print": "print_screen", "printscreen": "print_screen", "prtsc": "print_screen", "prtscr": "print_screen",
+    "print screen": "print_screen", "sysreq": "print_screen",
+    "break": "pause", "apps": "menu",
+}
+# Canonical names: modifiers, the named keys and f1-f24
+NAMED_KEYS = (
+    "ctrl", "ctrlleft", "ctrlright", "shift", "shiftleft", "shiftright", "alt", "altleft", "altright", "cmd",
+    "enter", "esc", "tab", "backspace", "space", "insert", "delete", "home", "end", "page_up", "page_down",
+    "left", "up", "right", "down", "caps_lock", "num_lock", "scroll_lock", "print_screen", "pause", "menu",
+) + tuple(f"f{n}" for n in range(1, 25))
+
+def canonical_key(key):
+    """The canonical name for a config key name; single characters are
+    returned as they are (lower-cased). None for names not in NAMED_KEYS."""
+    if len(key) == 1:
+        return key.lower()
+    name = key.strip().lower()
+    name = KEY_ALIASES.get(name, name)
+    return name if name in NAMED_KEYS else None
+
+def split_combo(key):
+    # "ctrl+i" -> ["ctrl", "i"]; a lone "+" is the plus key
+    if len(key) <= 1 or "+" not in key:
+        return [key]
+    return [part for part in key.split("+") if part] or [key]
+
+
+class InputBackend:
+    """Sends mouse clicks and key presses.
+
+    Keys are named as in config.json ("ctrl", "i", "f1", "page_up",
+    "ctrl+i", ...). A backend adds no delays of its own; pacing is left to
+    the ClickScheduler.
+    """
+
+    name = "base"
+
+    def position(self):
+        raise NotImplementedError
+
+    def click(self, x, y):
+        # Move to (x, y), then press and release the left button
+        raise NotImplementedError
+
+    def key_down(self, key):
+        raise NotImplementedError
+
+    def key_up(self, key):
+        raise NotImplementedError
+
+    def press(self, key):
+        # Combinations are pressed in order and released in reverse
+        keys = split_combo(key)
+        for part in keys:
+            self.key_down(part)
+        for part in reversed(keys):
+            self.key_up(part)
+
+    @contextmanager
+    def hold(self, key):
+        self.key_down(key)
+        try:
+            yield
+        finally:
+            self.key_up(key)
+
+
+class PyAutoGuiInput(InputBackend):
+    """pyautogui with its PAUSE sleep turned off; the portable fallback."""
+
+    name = "pyautogui"
+
+    def __init__(self):
+        # Imported here: pyautogui needs a display just to import
+        import pyautogui
+        self.pyautogui = pyautogui
+
+    def position(self):
+        return tuple(self.pyautogui.position())
+
+    def click(self, x, y):
+        self.pyautogui.click(x, y, _pause=False)
+
+    @staticmethod
+    def key_name(key):
+        # pyautogui's spelling of a config key name
+        return PYAUTOGUI_KEYS.get(canonical_key(key), key)
+
+    def key_down(self, key):
+        self.pyautogui.keyDown(self.key_name(key), _pause=False)
+
+    def key_up(self, key):
+        self.pyautogui.keyUp(self.key_name(key), _pause=False)
+
+
+PYAUTOGUI_KEYS = {
+    "page_up": "pageup", "page_down": "pagedown", "caps_lock": "capslock", "num_lock": "numlock",
+    "scroll_lock": "scrolllock", "print_screen": "printscreen", "cmd": "win", "menu": "apps",
+}
+
+
+class FallbackKeys:
+    """Sends keys a low-level backend has no code for through pyautogui."""
+
+    _fallback = None
+
+    def fallback(self):
+        if self._fallback is None:
+            self._fallback = PyAutoGuiInput()
+        return self._fallback
+
+
+# X keysym per canonical key name; other single characters are looked up
+# by XK.string_to_keysym
+X_KEYSYMS = {
+    "ctrl": "Control_L", "ctrlleft": "Control_L", "ctrlright": "Control_R",
+    "shift": "Shift_L", "shiftleft": "Shift_L", "shiftright": "Shift_R",
+    "alt": "Alt_L", "altleft": "Alt_L", "altright": "Alt_R", "cmd": "Super_L",
+    "enter": "Return", "esc": "Escape", "tab": "Tab", "backspace": "BackSpace", "space": "space",
+    "insert": "Insert", "delete": "Delete", "home": "Home", "end": "End",
+    "page_up": "Prior", "page_down": "Next",
+    "left": "Left", "up": "Up", "right": "Right", "down": "Down",
+    "caps_lock": "Caps_Lock", "num_lock": "Num_Lock", "scroll_lock": "Scroll_Lock",
+    "print_screen": "Print", "pause": "Pause", "menu": "Menu",
+}
+X_KEYSYMS.update({f"f{n}": f"F{n}" for n in range(1, 25)})
+
+
+class XTestInput(FallbackKeys, InputBackend):
+    """XTest fake input on X11 (needs python-xlib).
+
+    Each click is a motion, press and release sent in one flush, with no
+    failsafe or pause checks in between. Keys without a keycode on this
+    display go through pyautogui.
+    """
+
+    name = "xtest"
+
+    def __init__(self):
+        if xtest is None:
+            raise RuntimeError("python-xlib is not installed")
+        self.display = xdisplay.Display()
+        if not self.display.has_extension("XTEST"):
+            raise RuntimeError("The X server has no XTEST extension")
+        self.root = self.display.screen().root
+        self.keycodes = {}
+        # Xlib connections are not thread-safe
+        self.lock = threading.Lock()
+
+    def keycode(self, key):
+        # None when the key has no keycode here
+        if key not in self.keycodes:
+            name = canonical_key(key)
+            keysym = 0
+            if name in X_KEYSYMS:
+                keysym = XK.string_to_keysym(X_KEYSYMS[name])
+            elif name is not None:
+                keysym = XK.string_to_keysym(name) or XK.string_to_keysym(XK_CHARACTERS.get(name, ""))
+            self.keycodes[key] = (self.display.keysym_to_keycode(keysym) or None) if keysym else None
+        return self.keycodes[key]
+
+    def position(self):
+        with self.lock:
+            pointer = self.root.query_pointer()
+        return pointer.root_x, pointer.root_y
+
+    def click(self, x, y):
+        with self.lock:
+            xtest.fake_input(self.display, X.MotionNotify, x=int(x), y=int(y))
+            xtest.fake_input(self.display, X.ButtonPress, 1)
+            xtest.fake_input(self.display, X.ButtonRelease, 1)
+            self.display.flush()
+
+    def _key(self, event, key):
+        code = self.keycode(key)
+        if code is None:
+            fallback = self.fallback()
+            (fallback.key_down if event == X.KeyPress else fallback.key_up)(key)
+            return
+        with self.lock:
+            xtest.fake_input(self.display, event, code)
+            self.display.flush()
+
+    def key_down(self, key):
+        self._key(X.KeyPress, key)
+
+    def key_up(self, key):
+        self._key(X.KeyRelease, key)
+
+
+# Keysym names of punctuation, for string_to_keysym
+XK_CHARACTERS = {
+    " ": "space", "!": "exclam", '"': "quotedbl", "#": "numbersign", "$": "dollar", "%": "percent",
+    "&": "ampersand", "'": "apostrophe", "(": "parenleft", ")": "parenright", "*": "asterisk", "+": "plus",
+    ",": "comma", "-": "minus", ".": "period", "/": "slash", ":": "colon", ";": "semicolon", "<": "less",
+    "=": "equal", ">": "greater", "?": "question", "@": "at", "[": "bracketleft", "\\": "backslash",
+    "]": "bracketright", "^": "asciicircum", "_": "underscore", "`": "grave", "{": "braceleft", "|": "bar",
+    "}": "braceright", "~": "asciitilde",
+}
+
+# Virtual-key code per canonical key name; other single characters are
+# looked up with VkKeyScanW
+WINDOWS_VK = {
+    "ctrl": 0x11, "ctrlleft": 0xA2, "ctrlright": 0xA3,
+    "shift": 0x10, "shiftleft": 0xA0, "shiftright": 0xA1,
+    "alt": 0x12, "altleft": 0xA4, "altright": 0xA5, "cmd": 0x5B,
+    "enter": 0x0D, "esc": 0x1B, "tab": 0x09, "backspace": 0x08, "space": 0x20,
+    "insert": 0x2D, "delete": 0x2E, "home": 0x24, "end": 0x23, "page_up": 0x21, "page_down": 0x22,
+    "left": 0x25, "up": 0x26, "right": 0x27, "down": 0x28,
+    "caps_lock": 0x14, "num_lock": 0x90, "scroll_lock": 0x91, "print_screen": 0x2C, "pause": 0x13,
+    "menu": 0x5D,
+}
+WINDOWS_VK.update({f"f{n}": 0x6F + n for n in range(1, 25)})
+
+
+class SendInputWindows(FallbackKeys, InputBackend):
+    """SendInput on Windows through ctypes.
+
+    The cursor is placed with SetCursorPos and the button press and
+    release go to the input queue in a single SendInput call. Keys
+    without a virtual-key code go through pyautogui.
+    """
+
+    name = "sendinput"
+
+    def __init__(self):
+        if sys.platform != "win32":
+            raise RuntimeError("SendInput is only available on Windows")
+        import ctypes
+        from ctypes import wintypes
+
+        class MOUSEINPUT(ctypes.Structure):
+            _fields_ = [("dx", wintypes.LONG), ("dy", wintypes.LONG), ("mouseData", wintypes.DWORD),
+                        ("dwFlags", wintypes.DWORD), ("time", wintypes.DWORD),
+                        ("dwExtraInfo", ctypes.c_void_p)]
+
+        class KEYBDINPUT(ctypes.Structure):
+            _fields_ = [("wVk", wintypes.WORD), ("wScan", wintypes.WORD), ("dwFlags", wintypes.DWORD),
+                        ("time", wintypes.DWORD), ("dwExtraInfo", ctypes.c_void_p)]
+
+        class INPUTUNION(ctypes.Union):
+            _fields_ = [("mi", MOUSEINPUT), ("ki", KEYBDINPUT)]
+
+        class INPUT(ctypes.Structure):
+            _fields_ = [("type", wintypes.DWORD), ("union", INPUTUNION)]
+
+        self.ctypes = ctypes
+        self.user32 = ctypes.windll.user32
+        self.user32.VkKeyScanW.restype = ctypes.c_short
+        self.INPUT = INPUT
+        self.point = wintypes.POINT()
+        # INPUT_MOUSE, MOUSEEVENTF_LEFTDOWN, MOUSEEVENTF_LEFTUP
+        clicks = (INPUT * 2)()
+        for event, flags in zip(clicks, (0x0002, 0x0004)):
+            event.type = 0
+            event.union.mi.dwFlags = flags
+        self.clicks = clicks
+
+    def vk(self, key):
+        # None when the key has no virtual-key code
+        name = canonical_key(key)
+        if name in WINDOWS_VK:
+            return WINDOWS_VK[name]
+        if name is None or len(name) != 1:
+            return None
+        scan = self.user32.VkKeyScanW(ord(name))
+        return None if scan == -1 or scan & 0xFF == 0xFF else scan & 0xFF
+
+    def position(self):
+        self.user32.GetCursorPos(self.ctypes.byref(self.point))
+        return self.point.x, self.point.y
+
+    def click(self, x, y):
+        self.user32.SetCursorPos(int(x), int(y))
+        self.user32.SendInput(2, self.clicks, self.ctypes.sizeof(self.INPUT))
+
+    def _key(self, key, flags):
+        code = self.vk(key)
+        if code is None:
+            fallback = self.fallback()
+            (fallback.key_up if flags else fallback.key_down)(key)
+            return
+        event = self.INPUT()
+        event.type = 1  # INPUT_KEYBOARD
+        event.union.ki.wVk = code
+        event.union.ki.dwFlags = flags
+        self.user32.SendInput(1, self.ctypes.byref(event), self.ctypes.sizeof(self.INPUT))
+
+    def key_down(self, key):
+        self._key(key, 0)
+
+    def key_up(self, key):
+        self._key(key, 0x0002)  # KEYEVENTF_KEYUP
+
+
+class RecorderInput(InputBackend):
+    """Dry run: records every event with a perf_counter timestamp.
+
+    Nothing is sent to the system. Events are kept in `events` as
+    (time, kind, args) and, with a path, also appended to it as JSON lines.
+    """
+
+    name = "record"
+
+    def __init__(self, path=None, start=(0, 0), clock=time.perf_counter):
+        self.path = path
+        self.clock = clock
+        self.cursor = tuple(start)
+        self.events = []
+        self.lock = threading.Lock()
+
+    def record(self, kind, *args):
+        event = (self.clock(), kind, args)
+        with self.lock:
+            self.events.append(event)
+            if self.path:
+                with open(self.path, "a") as f:
+                    f.write(json.dumps({"time": event[0], "kind": kind, "args": list(args)}) + "\n")
+
+    def clear(self):
+        with self.lock:
+            self.events = []
+
+    def clicks(self):
+        return [(t, args) for t, kind, args in self.events if kind == "click"]
+
+    def position(self):
+        return self.cursor
+
+    def click(self, x, y):
+        self.cursor = (int(x), int(y))
+        self.record("click", int(x), int(y))
+
+    def key_down(self, key):
+        self.record("key_down", key)
+
+    def key_up(self, key):
+        self.record("key_up", key)
+
+
+BACKENDS = {
+    "pyautogui": PyAutoGuiInput,
+    "xtest": XTestInput,
+    "sendinput": SendInputWindows,
+}
+
+def create_input_backend(name="auto"):
+    # "auto" prefers SendInput on Windows and XTest on X11, then pyautogui;
+    # "record" or "record:<path>" is the dry-run recorder
+    if name == "auto":
+        if sys.platform == "win32":
+            return SendInputWindows()
+        if xtest is not None and os.environ.get("DISPLAY"):
+            try:
+                return XTestInput()
+            except Exception as e:
+                print(f"XTest input unavailable ({e}), using pyautogui")
+        return PyAutoGuiInput()
+    if name == "record" or name.startswith("record:"):
+        return RecorderInput(name[len("record:"):] or None)
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown input backend: {name}")
+    return BACKENDS[name]()
@@ -0,0 +1,248 @@
+import json
+import os
+import cv2
+import numpy as np
+import assets
+from region_utils import box_sums
+
+ITEMS_DIR = "items"
+MANIFEST_FILE = os.path.join(ITEMS_DIR, "manifest.json")
+LEGACY_TEMPLATE = "ga.png"
+DEFAULT_ITEM_THRESHOLD = 0.51
+SLOT_PAD_TOP = 20
+
+# Below this many items slots are matched against every item (or, with
+# ga_search "grid", one search per item over the grid) instead of
+# building colour signatures for every slot.
+PREFILTER_MIN_ITEMS = 4
+HUE_BINS = 12
+ACHROMATIC = -1
+MIN_COLORED_FRACTION = 0.1
+# An item is a candidate for a slot when the slot has at least this share
+# of the pixels the template has in its dominant hue bin (neighbours
+# included). Measured in pixels, not as a share of the slot, so small
+# icons in large padded slots still count.
+MIN_KEY_PRESENCE = 0.5
+
+def match_result_buffer(frame, image, template):
+    if frame is None:
+        return None
+    shape = (image.shape[0] - template.shape[0] + 1, image.shape[1] - template.shape[1] + 1)
+    return frame.buffer(('match', shape), shape, np.float32)
+
+def match_score(image, template, frame=None):
+    if image.shape[0] < template.shape[0] or image.shape[1] < template.shape[1]:
+        return -1.0
+    result = cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED,
+                               result=match_result_buffer(frame, image, template))
+    _, max_val, _, _ = cv2.minMaxLoc(result)
+    return max_val
+
+def score_jobs(jobs, frame=None, pool=None):
+    # Best score per (image, template) job; on the MatchPool if given
+    if pool is not None:
+        return pool.scores(jobs)
+    return np.array([match_score(image, template, frame) for image, template in jobs], dtype=np.float64)
+
+def search_template_in_slots(boxes, template_gray, frame, threshold=DEFAULT_ITEM_THRESHOLD, pad_top=SLOT_PAD_TOP,
+                             pool=None):
+    # Boolean mask over boxes of the slots holding the template
+    jobs = [(frame.crop_box(box, pad_top=pad_top), template_gray) for box in boxes]
+    return score_jobs(jobs, frame, pool) > threshold
+
+def search_template_in_grid(boxes, template_gray, frame, threshold=DEFAULT_ITEM_THRESHOLD, pad_top=SLOT_PAD_TOP):
+    # One matchTemplate over the bounding box of all slots. A slot holds the
+    # item when any match position whose template footprint lies inside
+    # that slot's search window (the same window search_template_in_slots
+    # crops) scores above the threshold. Returns a boolean mask over boxes.
+    if len(boxes) == 0:
+        return np.zeros(0, dtype=bool)
+    gray = frame.gray
+    height, width = gray.shape
+    template_height, template_width = template_gray.shape[:2]
+    ox, oy = frame.origin
+    x1 = np.clip(boxes[:, 0] - ox, 0, width)
+    y1 = np.clip(boxes[:, 1] - pad_top - oy, 0, height)
+    x2 = np.clip(boxes[:, 2] - ox, 0, width)
+    y2 = np.clip(boxes[:, 3] - oy, 0, height)
+
+    ax1, ay1, ax2, ay2 = x1.min(), y1.min(), x2.max(), y2.max()
+    area = gray[ay1:ay2, ax1:ax2]
+    if area.shape[0] < template_height or area.shape[1] < template_width:
+        return np.zeros(len(boxes), dtype=bool)
+    result = cv2.matchTemplate(area, template_gray, cv2.TM_CCOEFF_NORMED,
+                               result=match_result_buffer(frame, area, template_gray))
+
+    # Count above-threshold positions inside each slot's window of valid
+    # top-left corners with an integral image instead of a per-slot loop.
+    hits = frame.buffer('grid_hits', result.shape, np.float32)
+    cv2.threshold(result, threshold, 1, cv2.THRESH_BINARY, dst=hits)
+    result_height, result_width = result.shape
+    integral = frame.buffer('grid_integral', (result_height + 1, result_width + 1), np.float64)
+    cv2.integral(hits, sum=integral, sdepth=cv2.CV_64F)
+    windows = np.stack([
+        x1 - ax1,
+        y1 - ay1,
+        x2 - ax1 - template_width + 1,
+        y2 - ay1 - template_height + 1,
+    ], axis=1)
+    counts, _ = box_sums(integral, windows)
+    return counts > 0
+
+def hue_counts(bgr, min_saturation=60, min_value=40):
+    # Number of clearly coloured pixels per hue bin
+    hsv = cv2.cvtColor(bgr, cv2.COLOR_BGR2HSV)
+    colored = (hsv[..., 1] >= min_saturation) & (hsv[..., 2] >= min_value)
+    bins = hsv[..., 0][colored].astype(np.intp) * HUE_BINS // 180
+    return np.bincount(bins, minlength=HUE_BINS)
+
+def hue_histogram(bgr, min_saturation=60, min_value=40):
+    # Fraction of the image's pixels that are clearly coloured, per hue bin
+    return hue_counts(bgr, min_saturation, min_value) / max(1, bgr.shape[0] * bgr.shape[1])
+
+def hue_window(counts):
+    # Pixels per hue bin including both neighbouring bins (hue wraps)
+    return counts + np.roll(counts, 1) + np.roll(counts, -1)
+
+def signature_key(bgr):
+    histogram = hue_histogram(bgr)
+    if histogram.sum() < MIN_COLORED_FRACTION:
+        return ACHROMATIC
+    return int(np.argmax(histogram))
+
+
+class Item:
+    def __init__(self, name, template, threshold=DEFAULT_ITEM_THRESHOLD):
+        self.name = name
+        self.template = template
+        # The manifest's threshold; config overrides are applied per run
+        # through ItemLibrary.thresholds
+        self.threshold = threshold
+        self.key = signature_key(template.bgr)
+        # Pixels of the dominant hue (and its neighbours) in the template
+        self.key_pixels = 0 if self.key == ACHROMATIC else int(hue_window(hue_counts(template.bgr))[self.key])
+        self.id = -1
+
+
+class ItemLibrary:
+    """Item templates indexed by their dominant hue.
+
+    A slot is only matched against items whose dominant hue bin (or a
+    neighbouring one) is present in the slot with at least
+    MIN_KEY_PRESENCE of the template's pixel count, plus the achromatic
+    items, so the number of matchTemplate calls per slot stays small as
+    the library grows.
+    """
+
+    def __init__(self, items):
+        self.items = items
+        self.index = {}
+        for item_id, item in enumerate(items):
+            item.id = item_id
+            self.index.setdefault(item.key, []).append(item)
+        self.chromatic = [item for item in items if item.key != ACHROMATIC]
+        self.chromatic_keys = np.array([item.key for item in self.chromatic], dtype=np.intp)
+        self.chromatic_pixels = np.array([item.key_pixels for item in self.chromatic], dtype=np.float64)
+
+    def __len__(self):
+        return len(self.items)
+
+    def names(self):
+        return [item.name for item in self.items]
+
+    def ids(self, names):
+        return np.array([i for i, item in enumerate(self.items) if item.name in names], dtype=np.int32)
+
+    def thresholds(self, overrides=None):
+        # Threshold per item id: config's "item_thresholds" where given,
+        # else the manifest's. The library is shared and cached, so runs
+        # pass this tuple around instead of changing the items.
+        overrides = overrides or {}
+        return tuple(overrides.get(item.name, item.threshold) for item in self.items)
+
+    def name_of(self, item_id):
+        return self.items[item_id].name if item_id >= 0 else None
+
+    def candidates(self, slot_bgr):
+        window = hue_window(hue_counts(slot_bgr))
+        present = window[self.chromatic_keys] >= MIN_KEY_PRESENCE * self.chromatic_pixels
+        height, width = slot_bgr.shape[:2]
+        return [
+            item
+            for item in self.index.get(ACHROMATIC, []) + [self.chromatic[i] for i in np.flatnonzero(present)]
+            if item.template.gray.shape[0] <= height and item.template.gray.shape[1] <= width
+        ]
+
+    def classify(self, boxes, frame, mode="slots", pool=None, thresholds=None):
+        # Item id per box (index into self.items), -1 where nothing matched.
+        # thresholds is a tuple from thresholds(), the manifest's by
+        # default. In "slots" mode and with the colour prefilter every
+        # (slot, template) match is one job, so a MatchPool can spread
+        # them out.
+        if thresholds is None:
+            thresholds = self.thresholds()
+        item_ids = np.full(len(boxes), -1, dtype=np.int32)
+        if len(self.items) < PREFILTER_MIN_ITEMS and mode == "grid":
+            for item_id, item in enumerate(self.items):
+                hits = search_template_in_grid(boxes, item.template.gray, frame, thresholds[item_id])
+                item_ids[hits & (item_ids < 0)] = item_id
+            return item_ids
+
+        slots = [frame.crop_box(box, pad_top=SLOT_PAD_TOP) for box in boxes]
+        if len(self.items) < PREFILTER_MIN_ITEMS:
+            # First matching item wins, in library order
+            jobs = [(slot, item.template.gray) for item in self.items for slot in slots]
+            scores = score_jobs(jobs, frame, pool).reshape(len(self.items), len(boxes))
+            for item_id in range(len(self.items)):
+                item_ids[(scores[item_id] > thresholds[item_id]) & (item_ids < 0)] = item_id
+            return item_ids
+
+        # Best-scoring candidate above its threshold wins
+        jobs, job_slots, job_items = [], [], []
+        for i, box in enumerate(boxes):
+            slot_bgr = frame.crop_box(box, image=frame.bgr, pad_top=SLOT_PAD_TOP)
+            for item in self.candidates(slot_bgr):
+                jobs.append((slots[i], item.template.gray))
+                job_slots.append(i)
+                job_items.append(item.id)
+        scores = score_jobs(jobs, frame, pool)
+        best = np.full(len(boxes), -np.inf)
+        for slot, item_id, score in zip(job_slots, job_items, scores):
+            if score > thresholds[item_id] and score > best[slot]:
+                item_ids[slot], best[slot] = item_id, score
+        return item_ids
+
+
+def _build_library(manifest_path):
+    with open(manifest_path, 'r') as f:
+        manifest = json.load(f)
+    base_dir = os.path.dirname(manifest_path)
+    items = []
+    for entry in manifest:
+        template = assets.load_template(os.path.join(base_dir, entry['file']))
+        if template is None:
+            print(f"Error: Could not load item template {entry['file']}.")
+            continue
+        items.append(Item(entry['name'], template, entry.get('threshold', DEFAULT_ITEM_THRESHOLD)))
+    return ItemLibrary(items)
+
+def _build_legacy_library(template_path):
+    template = assets.load_template(template_path)
+    if template is None:
+        return None
+    return ItemLibrary([Item("ga", template)])
+
+def load_library(manifest_path=MANIFEST_FILE):
+    # items/manifest.json lists {"name", "file", "threshold"} entries; without
+    # it the library is just ga.png, as before item libraries existed.
+    # The library is rebuilt when the manifest or any template it lists
+    # changes on disk
+    manifest = assets.load_json(manifest_path)
+    library = None
+    if manifest is not None:
+        base_dir = os.path.dirname(manifest_path)
+        templates = [os.path.join(base_dir, entry['file']) for entry in manifest]
+        library = assets.cache.get(manifest_path, _build_library, kind="library", depends=templates)
+    if library is None:
+        library = assets.cache.get(LEGACY_TEMPLATE, _build_legacy_library, kind="library")
+    return library
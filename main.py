@@ -1,8 +1,20 @@
 import sys
 import os
+
+# --startup-profile has to hook imports before anything heavy is loaded
+STARTUP_PROFILE = "--startup-profile" in sys.argv
+if STARTUP_PROFILE:
+    sys.argv.remove("--startup-profile")
+    from startup_profile import ImportProfiler
+    profiler = ImportProfiler()
+    profiler.install()
+
 from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QTimer
 from utils import show_message_and_capture
 from config_window import ConfigWindow
+from calibration import apply_cached_calibration
+from screen_capture import screen_calibration_key
 
 REGION_FILE = "regions_small.json"
 
@@ -13,11 +25,17 @@ if __name__ == "__main__":
         if os.path.exists(REGION_FILE):
             os.remove(REGION_FILE)
         show_message_and_capture()
-    elif os.path.exists(REGION_FILE):
-        # Show configuration window if regions.json is present
-        app = QApplication(sys.argv)
-        config_window = ConfigWindow()
-        sys.exit(app.exec_())
     else:
-        # Show calibration message and capture screen if regions.json is not present
-        show_message_and_capture()
+        app = QApplication(sys.argv)
+        # A calibration stored for this resolution and scale replaces
+        # whatever was calibrated last, e.g. after switching monitors
+        calibrated = apply_cached_calibration(screen_calibration_key())
+        if calibrated or os.path.exists(REGION_FILE):
+            # Show configuration window if regions.json is present
+            config_window = ConfigWindow(warm_up_report=STARTUP_PROFILE)
+            if STARTUP_PROFILE:
+                QTimer.singleShot(0, lambda: profiler.report("config window shown"))
+            sys.exit(app.exec_())
+        else:
+            # Show calibration message and capture screen if regions.json is not present
+            show_message_and_capture()
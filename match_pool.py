@@ -0,0 +1,113 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+
+from frame import FrameBuffers
+
+DEFAULT_CHUNK_SIZE = 4
+MAX_AUTO_WORKERS = 4
+# Every this many batches the slower of serial/parallel is tried again,
+# in case the load on the machine changed
+RETRY_EVERY = 50
+
+
+def auto_workers():
+    return max(1, min(MAX_AUTO_WORKERS, (os.cpu_count() or 1) - 1))
+
+
+class MatchPool:
+    """Runs batches of (image, template) matches on a thread pool.
+
+    cv2.matchTemplate releases the GIL, so slot matches run in parallel on
+    plain threads. Jobs are handed out in chunks of chunk_size to keep the
+    per-task overhead small next to the matches themselves. Batches run
+    serially when the pool has one worker or the batch fits in one chunk;
+    otherwise the pool keeps a running average of the time per job both
+    ways and uses whichever has been faster (adaptive=False always uses
+    the pool).
+    """
+
+    def __init__(self, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, adaptive=True):
+        self.workers = auto_workers() if not workers else int(workers)
+        self.chunk_size = max(1, int(chunk_size))
+        self.adaptive = adaptive
+        # Seconds per job, indexed by "parallel"
+        self.job_seconds = {False: None, True: None}
+        self.batches = 0
+        self._executor = None
+        self._local = threading.local()
+
+    @classmethod
+    def from_config(cls, config):
+        # match_workers: 0 picks a count from the CPU, 1 disables the pool
+        return cls(config.get('match_workers', 0), config.get('match_chunk_size', DEFAULT_CHUNK_SIZE))
+
+    def settings(self):
+        return (self.workers, self.chunk_size)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _buffers(self):
+        # Match results are written into per-thread buffers
+        buffers = getattr(self._local, 'buffers', None)
+        if buffers is None:
+            buffers = self._local.buffers = FrameBuffers()
+        return buffers
+
+    def _score(self, image, template):
+        if image.shape[0] < template.shape[0] or image.shape[1] < template.shape[1]:
+            return -1.0
+        shape = (image.shape[0] - template.shape[0] + 1, image.shape[1] - template.shape[1] + 1)
+        result = cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED,
+                                   result=self._buffers().get(('match', shape), shape, np.float32))
+        return cv2.minMaxLoc(result)[1]
+
+    def _run_chunk(self, jobs, scores, start):
+        for offset, (image, template) in enumerate(jobs):
+            scores[start + offset] = self._score(image, template)
+
+    def parallel(self, job_count):
+        if self.workers <= 1 or job_count <= self.chunk_size:
+            return False
+        if not self.adaptive:
+            return True
+        serial, parallel = self.job_seconds[False], self.job_seconds[True]
+        if serial is None or parallel is None:
+            return serial is not None
+        faster = parallel < serial
+        if self.batches % RETRY_EVERY == 0:
+            return not faster
+        return faster
+
+    def scores(self, jobs):
+        """Best TM_CCOEFF_NORMED score per (image, template) job, in job order.
+
+        Templates larger than their image score -1.
+        """
+        scores = np.empty(len(jobs), dtype=np.float64)
+        if not jobs:
+            return scores
+        parallel = self.parallel(len(jobs))
+        start = time.perf_counter()
+        if not parallel:
+            self._run_chunk(jobs, scores, 0)
+        else:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="match")
+            futures = [
+                self._executor.submit(self._run_chunk, jobs[i:i + self.chunk_size], scores, i)
+                for i in range(0, len(jobs), self.chunk_size)
+            ]
+            for future in futures:
+                future.result()
+        job_seconds = (time.perf_counter() - start) / len(jobs)
+        previous = self.job_seconds[parallel]
+        self.job_seconds[parallel] = job_seconds if previous is None else 0.8 * previous + 0.2 * job_seconds
+        self.batches += 1
+        return scores
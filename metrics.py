@@ -0,0 +1,112 @@
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+METRICS_FILE = "metrics.jsonl"
+STAGES = (
+    "capture", "color_conversion", "open_check", "occupancy",
+    "item_detection", "click_planning", "click_execution", "streamed_item_detection", "verify",
+)
+
+
+class RunMetrics:
+    """Stage timings and counters for one drop run."""
+
+    def __init__(self, action):
+        self.action = action
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.stages = {}
+        self.counters = {}
+        self.total = None
+        # Time spent in nested spans, one entry per open span
+        self._nested = []
+
+    @contextmanager
+    def span(self, stage):
+        # Spans can nest (streamed item detection runs inside
+        # click_execution); each stage only gets the time not spent in a
+        # nested span, so stage times never count anything twice.
+        self._nested.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = self._nested.pop()
+            if self._nested:
+                self._nested[-1] += elapsed
+            # A stage can run more than once per run (e.g. capture retries)
+            self.stages[stage] = self.stages.get(stage, 0.0) + elapsed - nested
+
+    def count(self, name, value):
+        self.counters[name] = value
+
+    def finish(self):
+        self.total = time.perf_counter() - self._start
+
+    def to_record(self):
+        return {
+            "time": self.started,
+            "action": self.action,
+            "total_ms": round(self.total * 1000, 3) if self.total is not None else None,
+            "stages_ms": {stage: round(seconds * 1000, 3) for stage, seconds in self.stages.items()},
+            "counters": self.counters,
+        }
+
+
+class NullMetrics:
+    @contextmanager
+    def span(self, stage):
+        yield
+
+    def count(self, name, value):
+        pass
+
+
+NULL_METRICS = NullMetrics()
+
+
+class MetricsRecorder:
+    """Appends run records to a JSON-lines file and keeps rolling histograms.
+
+    The histograms hold the last `window` samples of every stage so the
+    GUI can show current percentiles without reading the file back.
+    """
+
+    def __init__(self, path=METRICS_FILE, window=200):
+        self.path = path
+        self.window = window
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    def start_run(self, action):
+        return RunMetrics(action)
+
+    def finish_run(self, run):
+        run.finish()
+        with self.lock:
+            for stage, seconds in list(run.stages.items()) + [("total", run.total)]:
+                self.samples.setdefault(stage, deque(maxlen=self.window)).append(seconds * 1000)
+        if self.path:
+            try:
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(run.to_record()) + "\n")
+            except IOError as e:
+                print(f"Could not write metrics to {self.path}: {e}")
+
+    def summary(self):
+        # {stage: (p50 ms, p95 ms, samples)} in pipeline order
+        with self.lock:
+            snapshot = {stage: np.array(values) for stage, values in self.samples.items()}
+        summary = {}
+        for stage in STAGES + ("total",):
+            values = snapshot.get(stage)
+            if values is not None and len(values):
+                p50, p95 = np.percentile(values, [50, 95])
+                summary[stage] = (p50, p95, len(values))
+        return summary
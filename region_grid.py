@@ -0,0 +1,100 @@
+import json
+import os
+import re
+import numpy as np
+
+SLOT_NAME = re.compile(r"^([a-z])(\d+)$")
+
+
+class RegionGrid:
+    """Inventory slots as an (N, 4) int32 array of x1, y1, x2, y2 boxes.
+
+    Stages work on boolean masks and index arrays over the slots; names,
+    rows and columns are kept alongside for reporting and click ordering.
+    """
+
+    def __init__(self, names, boxes, rows=None, cols=None):
+        self.names = [str(name) for name in names]
+        self.boxes = np.ascontiguousarray(boxes, dtype=np.int32).reshape(-1, 4)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        if rows is None or cols is None:
+            rows, cols = self._layout()
+        self.rows = np.asarray(rows, dtype=np.int32)
+        self.cols = np.asarray(cols, dtype=np.int32)
+
+    def _layout(self):
+        # Calibration names slots "<row letter><column number>", e.g. "b7"
+        matches = [SLOT_NAME.match(name) for name in self.names]
+        if all(matches):
+            rows = [ord(m.group(1)) - ord('a') for m in matches]
+            cols = [int(m.group(2)) - 1 for m in matches]
+            return rows, cols
+        # Otherwise rank the distinct top and left edges
+        _, rows = np.unique(self.boxes[:, 1], return_inverse=True)
+        _, cols = np.unique(self.boxes[:, 0], return_inverse=True)
+        return rows, cols
+
+    def __len__(self):
+        return len(self.names)
+
+    def same_layout(self, other):
+        # Same slots in the same places, whichever file each was loaded from
+        return (other is not None and self.names == other.names and np.array_equal(self.boxes, other.boxes)
+                and np.array_equal(self.rows, other.rows) and np.array_equal(self.cols, other.cols))
+
+    @classmethod
+    def from_regions(cls, regions):
+        names = [r['name'] for r in regions]
+        boxes = [[r['x1'], r['y1'], r['x2'], r['y2']] for r in regions]
+        return cls(names, boxes)
+
+    def to_regions(self, selection=None):
+        indices = self.indices(selection)
+        return [
+            {"name": self.names[i], "x1": int(x1), "y1": int(y1), "x2": int(x2), "y2": int(y2)}
+            for i, (x1, y1, x2, y2) in zip(indices, self.boxes[indices])
+        ]
+
+    def indices(self, selection=None):
+        # selection may be None (all slots), a boolean mask or an index array
+        if selection is None:
+            return np.arange(len(self.names))
+        selection = np.asarray(selection)
+        if selection.dtype == bool:
+            return np.flatnonzero(selection)
+        return selection.astype(np.intp, copy=False)
+
+    def names_for(self, selection):
+        return [self.names[i] for i in self.indices(selection)]
+
+    def mask(self, names=()):
+        mask = np.zeros(len(self.names), dtype=bool)
+        for name in names:
+            if name in self.index:
+                mask[self.index[name]] = True
+        return mask
+
+    def bbox(self):
+        return (
+            int(self.boxes[:, 0].min()),
+            int(self.boxes[:, 1].min()),
+            int(self.boxes[:, 2].max()),
+            int(self.boxes[:, 3].max()),
+        )
+
+    @classmethod
+    def load_json(cls, path):
+        with open(path, 'r') as f:
+            return cls.from_regions(json.load(f))
+
+    @classmethod
+    def load_binary(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['names'], data['boxes'], data['rows'], data['cols'])
+
+    def save_binary(self, path):
+        # Written aside and moved into place, so a reader never sees half a file
+        partial = path + '.partial'
+        with open(partial, 'wb') as f:
+            np.savez(f, names=np.array(self.names), boxes=self.boxes, rows=self.rows, cols=self.cols)
+        os.replace(partial, path)
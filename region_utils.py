@@ -1,31 +1,161 @@
-import json
+import os
 import cv2
 import numpy as np
-import pyautogui
-import os
+import assets
+from calibration import ANCHOR_FILE, indicator_capture_rect, save_indicator_anchor
+from frame import Frame
+from region_grid import RegionGrid
+# Pixels darker than this count towards a slot looking empty
+DARK_CUTOFF = 50
 
 def load_config():
     config_file = 'config.json'
     default_config = {"threshold": 0.85, "inventory_key": "c"}
-    if os.path.exists(config_file):
-        with open(config_file, 'r') as f:
-            return json.load(f)
-    return default_config
+    return assets.load_config(config_file, default_config)
+
+def occupancy_threshold(config):
+    # tune.py writes occupancy_threshold; the top-level threshold is also
+    # the inventory indicator's match threshold
+    return config.get('occupancy_threshold', config.get('threshold', 0.85))
+
+def load_regions(region_file='regions_full.json'):
+    return assets.load_regions(region_file)
+
+def binary_grid_file(region_file):
+    return os.path.splitext(region_file)[0] + '.npz'
+
+def load_json_grid(region_file):
+    # Runs once per change of the JSON (through the asset cache), so the
+    # binary copy next to it is only rewritten when it went stale
+    grid = RegionGrid.load_json(region_file)
+    if grid:
+        binary_file = binary_grid_file(region_file)
+        try:
+            grid.save_binary(binary_file)
+        except OSError as e:
+            print(f"Could not write {binary_file}: {e}")
+    return grid
+
+# Last grid handed out per region file. The slot cache and the live overlay
+# compare grids by identity, so an unchanged layout keeps its instance when
+# it is next read from the other file (JSON, then the binary copy).
+_current_grids = {}
+
+def load_region_grid(region_file='regions_full.json'):
+    grid = _load_region_grid(region_file)
+    current = _current_grids.get(region_file)
+    if grid is current or not grid:
+        return grid
+    if grid.same_layout(current):
+        return current
+    _current_grids[region_file] = grid
+    return grid
+
+def _load_region_grid(region_file):
+    # Prefers the binary copy next to the JSON while it is at least as new;
+    # otherwise parses the JSON (e.g. after recalibrating) and rewrites it.
+    binary_file = binary_grid_file(region_file)
+    try:
+        json_mtime = os.stat(region_file).st_mtime_ns
+    except OSError:
+        json_mtime = None
+    try:
+        binary_mtime = os.stat(binary_file).st_mtime_ns
+    except OSError:
+        binary_mtime = None
+
+    if binary_mtime is not None and (json_mtime is None or binary_mtime >= json_mtime):
+        return assets.cache.get(binary_file, RegionGrid.load_binary, kind='grid')
+    return assets.cache.get(region_file, load_json_grid, kind='grid')
+
+def load_indicator_anchor(anchor_file=ANCHOR_FILE):
+    # Screen rectangle inv.png was captured from during calibration, or
+    # where it was last found
+    anchor = assets.load_json(anchor_file)
+    if not anchor:
+        return None
+    return (anchor['x1'], anchor['y1'], anchor['x2'], anchor['y2'])
+
+def regions_bbox(regions):
+    if isinstance(regions, RegionGrid):
+        return regions.bbox()
+    return (
+        min(r['x1'] for r in regions),
+        min(r['y1'] for r in regions),
+        max(r['x2'] for r in regions),
+        max(r['y2'] for r in regions),
+    )
+
+def indicator_rect(regions):
+    # Where inv.png was captured from, estimated from the slots when there
+    # is no saved anchor
+    return indicator_capture_rect(regions_bbox(regions))
+
+def indicator_bbox(regions, margin=10, indicator=None):
+    # indicator is the saved anchor rectangle, if there is one
+    x1, y1, x2, y2 = indicator or indicator_rect(regions)
+    return (max(0, x1 - margin), max(0, y1 - margin), x2 + margin, y2 + margin)
+
+def capture_bbox(regions, margin=20, indicator=None):
+    gx1, gy1, gx2, gy2 = regions_bbox(regions)
+    ix1, iy1, ix2, iy2 = indicator or indicator_rect(regions)
+    return (
+        max(0, min(gx1, ix1) - margin),
+        max(0, min(gy1, iy1) - margin),
+        max(gx2, ix2) + margin,
+        max(gy2, iy2) + margin,
+    )
 
 def is_region_empty(region, screen, threshold):
+    # The original per-region check, kept as the reference classify_occupancy
+    # is tested against. screen is a screenshot passed through
+    # cv2.cvtColor(..., COLOR_BGR2RGB), as the original caller did.
     x1, y1, x2, y2 = region['x1'], region['y1'], region['x2'], region['y2']
     region_image = screen[y1:y2, x1:x2]
     gray_image = cv2.cvtColor(region_image, cv2.COLOR_RGB2GRAY)
     dark_pixels_ratio = np.mean(gray_image < 50)
     return dark_pixels_ratio > threshold
 
-def find_occupied_regions(regions_full, dark_threshold):
-    screen = np.array(pyautogui.screenshot())
-    screen = cv2.cvtColor(screen, cv2.COLOR_BGR2RGB)
+def region_boxes(regions):
+    boxes = [[r['x1'], r['y1'], r['x2'], r['y2']] for r in regions]
+    return np.array(boxes, dtype=np.int32).reshape(-1, 4)
+
+def box_sums(integral, boxes, origin=(0, 0)):
+    # Sum of the integrated image inside every box, clipped to the image the
+    # same way numpy slicing clips a crop. Returns (sums, areas).
+    height, width = integral.shape[0] - 1, integral.shape[1] - 1
+    ox, oy = origin
+    x1 = np.clip(boxes[:, 0] - ox, 0, width)
+    y1 = np.clip(boxes[:, 1] - oy, 0, height)
+    x2 = np.maximum(np.clip(boxes[:, 2] - ox, 0, width), x1)
+    y2 = np.maximum(np.clip(boxes[:, 3] - oy, 0, height), y1)
+    sums = integral[y2, x2] - integral[y1, x2] - integral[y2, x1] + integral[y1, x1]
+    return sums, (x2 - x1) * (y2 - y1)
+
+def dark_pixel_ratios(gray, boxes, origin=(0, 0), cutoff=DARK_CUTOFF, frame=None):
+    if frame is None:
+        integral = cv2.integral((gray < cutoff).view(np.uint8))
+    else:
+        # Pixels <= cutoff - 1 become 1, everything else 0
+        mask = frame.buffer('dark_mask', gray.shape)
+        cv2.threshold(gray, cutoff - 1, 1, cv2.THRESH_BINARY_INV, dst=mask)
+        height, width = gray.shape
+        integral = frame.buffer('dark_integral', (height + 1, width + 1), np.int32)
+        cv2.integral(mask, sum=integral, sdepth=cv2.CV_32S)
+    dark, area = box_sums(integral, boxes, origin)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Empty boxes give NaN, which like np.mean of an empty crop never
+        # counts as empty.
+        return dark / area.astype(np.float64)
+
+def classify_occupancy(frame, boxes, threshold, cutoff=DARK_CUTOFF):
+    ratios = dark_pixel_ratios(frame.gray, boxes, frame.origin, cutoff, frame=frame)
+    return ~(ratios > threshold)
 
-    occupied_regions = []
-    for region in regions_full:
-        if not is_region_empty(region, screen, dark_threshold):
-            occupied_regions.append(region)
+def find_occupied_regions(regions_full, dark_threshold, frame=None, cutoff=DARK_CUTOFF):
+    # List-of-dict wrapper around classify_occupancy
+    if frame is None:
+        frame = Frame.grab()
 
-    return occupied_regions
+    occupied = classify_occupancy(frame, region_boxes(regions_full), dark_threshold, cutoff)
+    return [region for region, is_occupied in zip(regions_full, occupied) if is_occupied]
@@ -1,19 +1,50 @@
 import json
 import sys
 from PyQt5.QtWidgets import QApplication, QMainWindow
-from PyQt5.QtGui import QPainter, QColor, QPen
-from PyQt5.QtCore import Qt, QRect
+from PyQt5.QtGui import QPainter, QColor, QPen, QPixmap
+from PyQt5.QtCore import Qt, QRect, QTimer
 
 REGION_FILE_FULL = "regions_full.json"
 REGION_FILE_SMALL = "regions_small.json"
+LIVE_FPS = 30
+
+# Slot fills for the live overlay: occupied slots with no item match, then
+# one colour per item id (cycled)
+OCCUPIED_COLOR = QColor(255, 170, 0, 110)
+ITEM_COLORS = [
+    QColor(0, 200, 255, 140), QColor(255, 0, 200, 140), QColor(120, 255, 0, 140),
+    QColor(255, 255, 0, 140), QColor(160, 100, 255, 140), QColor(255, 80, 80, 140),
+]
 
 class RegionVisualizer(QMainWindow):
-    def __init__(self):
+    """Shows the calibrated regions over the screen.
+
+    The region outlines and names are drawn once into a cached pixmap;
+    paint events copy only the damaged part of it. With an engine the
+    overlay is live: up to LIVE_FPS times a second it picks up the
+    engine's latest analysis and repaints just the slots whose occupancy
+    or item changed, coloured by their result. A live overlay lets mouse
+    input through to the game and is closed from the config window.
+    """
+
+    def __init__(self, engine=None):
         super().__init__()
+        self.engine = engine
         self.regions_full = []
         self.regions_small = []
+        self.static_layer = None
+        # Slot rects and results currently on screen
+        self.slot_rects = []
+        self.slot_colors = []
+        self.slot_labels = []
+        self.shown_count = None
+        self.shown_result = None
         self.load_regions()
         self.initUI()
+        if engine is not None:
+            self.timer = QTimer(self)
+            self.timer.timeout.connect(self.refresh_results)
+            self.timer.start(1000 // LIVE_FPS)
 
     def load_regions(self):
         try:
@@ -31,17 +62,20 @@ class RegionVisualizer(QMainWindow):
     def initUI(self):
         self.setWindowTitle('Region Visualizer')
         self.setWindowOpacity(0.4)
-        self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint)
+        flags = Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint
+        if self.engine is not None:
+            # Clicks go through to the game while drops run
+            flags |= Qt.Tool | Qt.WindowTransparentForInput
+        self.setWindowFlags(flags)
         self.setAttribute(Qt.WA_TranslucentBackground)
         self.showFullScreen()
 
-    def paintEvent(self, event):
-        painter = QPainter(self)
+    def build_static_layer(self):
+        self.static_layer = QPixmap(self.size())
+        self.static_layer.fill(Qt.transparent)
+        painter = QPainter(self.static_layer)
         painter.setRenderHint(QPainter.Antialiasing)
 
-        # Semi-transparent overlay
-        painter.fillRect(self.rect(), QColor(0, 0, 0, 0))
-
         # Draw regions_full
         pen_full = QPen(QColor(0, 255, 0), 2)  # Green rectangles
         painter.setPen(pen_full)
@@ -62,7 +96,73 @@ class RegionVisualizer(QMainWindow):
         font = painter.font()
         font.setPointSize(16)
         painter.setFont(font)
-        painter.drawText(self.rect(), Qt.AlignTop | Qt.AlignHCenter, "Press ESC to close")
+        text = "Close from the config window" if self.engine is not None else "Press ESC to close"
+        painter.drawText(self.rect(), Qt.AlignTop | Qt.AlignHCenter, text)
+        painter.end()
+
+    def resizeEvent(self, event):
+        self.static_layer = None
+        super().resizeEvent(event)
+
+    def paintEvent(self, event):
+        if self.static_layer is None or self.static_layer.size() != self.size():
+            self.build_static_layer()
+        damaged = event.rect()
+        painter = QPainter(self)
+        painter.setCompositionMode(QPainter.CompositionMode_Source)
+        painter.drawPixmap(damaged, self.static_layer, damaged)
+        painter.setCompositionMode(QPainter.CompositionMode_SourceOver)
+
+        for rect, color, label in zip(self.slot_rects, self.slot_colors, self.slot_labels):
+            if color is None or not rect.intersects(damaged):
+                continue
+            painter.fillRect(rect, color)
+            if label:
+                painter.setPen(QColor(255, 255, 255))
+                painter.drawText(rect, Qt.AlignBottom | Qt.AlignHCenter, label)
+
+    def refresh_results(self):
+        # Runs on the GUI thread; the engine replaces latest_analysis as a
+        # whole, so reading it needs no lock
+        latest = self.engine.latest_analysis
+        if latest is None or latest[0] == self.shown_count:
+            return
+        count, grid, occupied, item_ids, library = latest
+        self.shown_count = count
+
+        new_grid = len(self.slot_rects) != len(grid.boxes) or self.shown_result is None \
+            or self.shown_result[0] is not grid
+        if new_grid:
+            # New grid: the old fills sit wherever the previous slots were,
+            # so the whole window is repainted below
+            self.slot_rects = [QRect(int(x1), int(y1), int(x2 - x1), int(y2 - y1)) for x1, y1, x2, y2 in grid.boxes]
+            self.slot_colors = [None] * len(grid.boxes)
+            self.slot_labels = [""] * len(grid.boxes)
+            changed = range(len(grid.boxes))
+        else:
+            _, shown_occupied, shown_ids = self.shown_result
+            changed = ((occupied != shown_occupied) | (item_ids != shown_ids)).nonzero()[0]
+        self.shown_result = (grid, occupied, item_ids)
+
+        for i in changed:
+            i = int(i)
+            if not occupied[i]:
+                self.slot_colors[i], self.slot_labels[i] = None, ""
+            elif item_ids[i] < 0:
+                self.slot_colors[i], self.slot_labels[i] = OCCUPIED_COLOR, ""
+            else:
+                item_id = int(item_ids[i])
+                self.slot_colors[i] = ITEM_COLORS[item_id % len(ITEM_COLORS)]
+                self.slot_labels[i] = library.name_of(item_id)
+            if not new_grid:
+                self.update(self.slot_rects[i].adjusted(-2, -2, 2, 2))
+        if new_grid:
+            self.update()
+
+    def closeEvent(self, event):
+        if self.engine is not None:
+            self.timer.stop()
+        super().closeEvent(event)
 
     def keyPressEvent(self, event):
         if event.key() == Qt.Key_Escape:
@@ -1,18 +1,19 @@
 import json
 import sys
-from PyQt5.QtWidgets import QMainWindow, QApplication
+from PyQt5.QtWidgets import QMainWindow, QApplication, QDialog
 from PyQt5.QtCore import QRect, Qt
-from PyQt5.QtGui import QPainter, QColor
+from PyQt5.QtGui import QPainter, QColor, QPixmap
 import os
-
-REGION_FILE_FULL = "regions_full.json"
-REGION_FILE_SMALL = "regions_small.json"
+from calibration import (
+    ANCHOR_FILE, INDICATOR_FILE, REGION_FILE_FULL, REGION_FILE_SMALL, calibration_key, indicator_capture_rect,
+    regions_from_rect, save_indicator_anchor, store_calibration)
 
 class ScreenCapture(QMainWindow):
     def __init__(self):
         super().__init__()
         self.start_pos = None
         self.end_pos = None
+        self.background = None
         self.initUI()
 
     def initUI(self):
@@ -22,8 +23,11 @@ class ScreenCapture(QMainWindow):
         self.setAttribute(Qt.WA_TranslucentBackground)
         self.showFullScreen()
 
-    def paintEvent(self, event):
-        painter = QPainter(self)
+    def build_background(self):
+        # The backdrop and instructions never change, so they are drawn once
+        self.background = QPixmap(self.size())
+        self.background.fill(Qt.transparent)
+        painter = QPainter(self.background)
         painter.setPen(QColor(255, 255, 255))
         painter.setBrush(QColor(0, 0, 0))
         painter.drawRect(self.rect())
@@ -38,13 +42,33 @@ class ScreenCapture(QMainWindow):
         font.setBold(True)
         painter.setFont(font)
         painter.drawText(self.rect(), Qt.AlignCenter, instructions)
+        painter.end()
+
+    def paintEvent(self, event):
+        if self.background is None or self.background.size() != self.size():
+            self.build_background()
+        painter = QPainter(self)
+        painter.setCompositionMode(QPainter.CompositionMode_Source)
+        painter.drawPixmap(event.rect(), self.background, event.rect())
+        painter.setCompositionMode(QPainter.CompositionMode_SourceOver)
 
         if self.start_pos and self.end_pos:
+            painter.setPen(QColor(255, 255, 255))
             painter.setBrush(QColor(255, 255, 255, 50))
-            rect = QRect(self.start_pos, self.end_pos).normalized()
+            rect = self.selection_rect()
             painter.drawRect(rect)
             self.draw_grid_lines(painter, rect)
 
+    def selection_rect(self):
+        return QRect(self.start_pos, self.end_pos).normalized()
+
+    def update_selection(self, previous):
+        # Only the old and new selection need repainting, plus the pen width
+        damaged = self.selection_rect()
+        if previous is not None:
+            damaged = damaged.united(previous)
+        self.update(damaged.adjusted(-2, -2, 2, 2))
+
     def draw_grid_lines(self, painter, rect):
         col_width = rect.width() / 11
         row_height = rect.height() / 3
@@ -59,14 +83,16 @@ class ScreenCapture(QMainWindow):
 
     def mousePressEvent(self, event):
         if event.button() == Qt.LeftButton:
+            previous = self.selection_rect() if self.start_pos and self.end_pos else None
             self.start_pos = event.pos()
             self.end_pos = event.pos()
-            self.update()
+            self.update_selection(previous)
 
     def mouseMoveEvent(self, event):
         if event.buttons() & Qt.LeftButton:
+            previous = self.selection_rect()
             self.end_pos = event.pos()
-            self.update()
+            self.update_selection(previous)
 
     def mouseReleaseEvent(self, event):
         if event.button() == Qt.LeftButton:
@@ -78,47 +104,8 @@ class ScreenCapture(QMainWindow):
             self.capture_screenshot(selected_region)
 
     def calculate_regions(self, selected_region):
-        col_width = selected_region.width() / 11
-        row_height = selected_region.height() / 3
-
-        regions_full = []
-        regions_small = []
-
-
-        for row in range(3):
-            for col in range(11):
-                x1 = selected_region.left() + col * col_width
-                y1 = selected_region.top() + row * row_height
-                x2 = x1 + col_width
-                y2 = y1 + row_height
-
-                # Calculate 2% smaller region
-                shrink_factor = 0.02
-                x1_shrunk = int(x1 + col_width * shrink_factor)
-                y1_shrunk = int(y1 + row_height * shrink_factor)
-                x2_shrunk = int(x2 - col_width * shrink_factor)
-                y2_shrunk = int(y2 - row_height * shrink_factor)
-
-                regions_full.append({
-                    "name": chr(ord('a') + row) + str(col + 1),
-                    "x1": x1_shrunk,  # Use shrunk coordinates
-                    "y1": y1_shrunk,
-                    "x2": x2_shrunk,
-                    "y2": y2_shrunk
-                })
-
-                small_width = col_width * 0.15
-                small_height = row_height * 0.70
-                small_x1 = x1 + (col_width - small_width) / 4
-                small_y1 = y1 + (row_height - small_height) / 4
-
-                regions_small.append({
-                    "name": chr(ord('a') + row) + str(col + 1),
-                    "x1": int(small_x1),
-                    "y1": int(small_y1),
-                    "x2": int(small_x1 + small_width),
-                    "y2": int(small_y1 + small_height)
-                })
+        left, top, right, bottom = selected_region.getCoords()
+        regions_full, regions_small = regions_from_rect((left, top, right + 1, bottom + 1))
 
         self.save_regions(REGION_FILE_FULL, regions_full)
         self.save_regions(REGION_FILE_SMALL, regions_small)
@@ -135,16 +122,82 @@ class ScreenCapture(QMainWindow):
             print("Error: No screen found!")
             return
 
-        capture_width = selected_region.width() * (2.5 / 11)
-        capture_height = selected_region.height() * (2.5 / 11)
-        capture_x = selected_region.right() - capture_width
-        capture_y = selected_region.top() - capture_height
+        left, top, right, bottom = selected_region.getCoords()
+        rect = (left, top, right + 1, bottom + 1)
+        x1, y1, x2, y2 = indicator_capture_rect(rect)
+        screenshot = screen.grabWindow(0, x1, y1, x2 - x1, y2 - y1)
+        screenshot.save(INDICATOR_FILE, "png")
+        print(f"Screenshot saved as {INDICATOR_FILE}")
+
+        # Remember where inv.png came from so the open check can look there first
+        save_indicator_anchor((x1, y1, x2, y2))
+        print(f"Indicator anchor saved to {ANCHOR_FILE}")
+
+        # Keep this selection for the current resolution so switching back
+        # to it later does not need another calibration
+        store_calibration(screen_calibration_key(screen), rect)
+
+class GridPreview(QDialog):
+    """Shows an automatically detected grid for the user to accept.
+
+    The slots and the indicator patch that would be saved are outlined
+    over the screen; Enter accepts them, Esc or R rejects them so the
+    manual selection can be used instead.
+    """
+
+    def __init__(self, rect):
+        super().__init__()
+        self.rect_found = rect
+        self.regions_full, _ = regions_from_rect(rect)
+        self.setWindowTitle('Detected Grid')
+        self.setWindowOpacity(0.6)
+        self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint)
+        self.setAttribute(Qt.WA_TranslucentBackground)
+        self.showFullScreen()
 
-        capture_region = QRect(int(capture_x), int(capture_y), int(capture_width), int(capture_height))
-        screenshot = screen.grabWindow(0, capture_region.x(), capture_region.y(), capture_region.width(), capture_region.height())
-        screenshot_file = "inv.png"
-        screenshot.save(screenshot_file, "png")
-        print(f"Screenshot saved as {screenshot_file}")
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor(0, 0, 0, 120))
+        painter.setPen(QColor(0, 255, 0))
+        for region in self.regions_full:
+            painter.drawRect(QRect(region['x1'], region['y1'], region['x2'] - region['x1'],
+                                   region['y2'] - region['y1']))
+        x1, y1, x2, y2 = indicator_capture_rect(self.rect_found)
+        painter.setPen(QColor(255, 0, 0))
+        painter.drawRect(QRect(x1, y1, x2 - x1, y2 - y1))
+
+        painter.setPen(QColor(255, 255, 255))
+        font = painter.font()
+        font.setPointSize(20)
+        font.setBold(True)
+        painter.setFont(font)
+        painter.drawText(self.rect(), Qt.AlignTop | Qt.AlignHCenter,
+                         "Inventory grid found. Press ENTER to use it,\n"
+                         "or ESC / R to select the region yourself.")
+
+    def keyPressEvent(self, event):
+        if event.key() in (Qt.Key_Return, Qt.Key_Enter):
+            self.accept()
+        elif event.key() in (Qt.Key_Escape, Qt.Key_R):
+            self.reject()
+
+
+def confirm_grid(rect):
+    # Blocks until the user accepts or rejects the detected grid
+    return GridPreview(rect).exec_() == QDialog.Accepted
+
+def screen_calibration_key(screen=None):
+    # Resolution in physical pixels, the OS scale factor and the in-game
+    # UI scale from config.json
+    screen = screen or QApplication.primaryScreen()
+    dpi_scale = screen.devicePixelRatio()
+    size = screen.size()
+    try:
+        with open("config.json", "r") as f:
+            ui_scale = json.load(f).get("ui_scale", 1.0)
+    except (IOError, ValueError):
+        ui_scale = 1.0
+    return calibration_key(size.width() * dpi_scale, size.height() * dpi_scale, dpi_scale, ui_scale)
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
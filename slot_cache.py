@@ -0,0 +1,63 @@
+import zlib
+import numpy as np
+from item_detection import SLOT_PAD_TOP
+
+# Item id of an occupied slot whose item has not been looked at yet
+UNCLASSIFIED = -2
+
+
+class SlotCache:
+    """Last classification of every slot, keyed by a hash of its pixels.
+
+    A slot whose crop hashes the same as on the previous scan keeps its
+    previous occupancy and item result. Occupied slots stored without
+    item detection keep the item id UNCLASSIFIED until classify_items.
+    Anything that changes how pixels are classified (threshold,
+    calibration, item library) must go through set_context or invalidate.
+    """
+
+    def __init__(self):
+        self.context = None
+        self.reset(0)
+
+    def reset(self, size):
+        self.fingerprints = np.zeros(size, dtype=np.uint32)
+        self.valid = np.zeros(size, dtype=bool)
+        self.occupied = np.zeros(size, dtype=bool)
+        self.item_ids = np.full(size, -1, dtype=np.int32)
+
+    def invalidate(self):
+        self.valid[:] = False
+
+    def set_context(self, context, size):
+        if context != self.context or len(self.valid) != size:
+            self.reset(size)
+            self.context = context
+
+    @staticmethod
+    def fingerprint(frame, box):
+        # The padded gray crop covers both the occupancy box and the item
+        # search window.
+        return zlib.crc32(np.ascontiguousarray(frame.crop_box(box, pad_top=SLOT_PAD_TOP)))
+
+    def fingerprints_for(self, frame, boxes):
+        return np.fromiter((self.fingerprint(frame, box) for box in boxes), dtype=np.uint32, count=len(boxes))
+
+    def stale(self, fingerprints):
+        return ~self.valid | (self.fingerprints != fingerprints)
+
+    def store(self, indices, fingerprints, occupied, item_ids):
+        self.fingerprints[indices] = fingerprints
+        self.occupied[indices] = occupied
+        self.item_ids[indices] = item_ids
+        self.valid[indices] = True
+
+    def unclassified(self, indices=None):
+        # Indices (of `indices`, or of all slots) still waiting for items
+        if indices is None:
+            indices = np.arange(len(self.valid))
+        pending = self.valid[indices] & self.occupied[indices] & (self.item_ids[indices] == UNCLASSIFIED)
+        return indices[pending]
+
+    def classify_items(self, indices, item_ids):
+        self.item_ids[indices] = item_ids
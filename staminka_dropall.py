@@ -2,119 +2,648 @@ import sys
 import json
 import cv2
 import numpy as np
-import pyautogui
 import time
-import random
+import threading
 from rich import print
-from rich.console import Console
-from rich.table import Table
-from region_utils import load_config, find_occupied_regions
-import random
+from region_utils import (
+    DARK_CUTOFF, load_config, load_region_grid, classify_occupancy, region_boxes, capture_bbox, indicator_bbox,
+    load_indicator_anchor, save_indicator_anchor, occupancy_threshold,
+)
+import assets
+from capture import create_backend, PyAutoGuiBackend
+from input_backend import create_input_backend
+from capture_process import CaptureProcess, SharedFrameBackend, DEFAULT_MAX_AGE, DEFAULT_FPS as CAPTURE_FPS
+from frame import Frame, FrameBuffers
+from item_detection import match_result_buffer, search_template_in_slots, search_template_in_grid, load_library
+from slot_cache import SlotCache, UNCLASSIFIED
+from click_scheduler import ClickScheduler, PacingProfile, order_targets
+from match_pool import MatchPool
+from metrics import MetricsRecorder, NULL_METRICS, METRICS_FILE
+
+def locate_indicator(roi, indicator_image, threshold, frame=None):
+    # Top-left corner of the best match inside roi, or None below threshold
+    if roi.shape[0] < indicator_image.shape[0] or roi.shape[1] < indicator_image.shape[1]:
+        return None
+    result = cv2.matchTemplate(roi, indicator_image, cv2.TM_CCOEFF_NORMED,
+                               result=match_result_buffer(frame, roi, indicator_image))
+    _, max_val, _, max_loc = cv2.minMaxLoc(result)
+    return max_loc if max_val >= threshold else None
+
+def match_indicator(roi, indicator_image, threshold, frame=None):
+    return locate_indicator(roi, indicator_image, threshold, frame) is not None
 
 def check_inventory_open(screen, indicator_image, threshold=0.95):
     screen_height, screen_width, _ = screen.shape
     roi = screen[:, int(screen_width * 0.8):]
-    result = cv2.matchTemplate(roi, indicator_image, cv2.TM_CCOEFF_NORMED)
-    _, max_val, _, _ = cv2.minMaxLoc(result)
-    return max_val >= threshold
+    return match_indicator(roi, indicator_image, threshold)
+
+def find_indicator(frame, indicator_image, threshold, anchor=None, tolerance=8, wide=False):
+    # Checks the anchored rectangle (plus tolerance) first and only searches
+    # the rest of the frame when that fails. Returns (is_open, new_anchor);
+    # new_anchor is the rectangle the indicator was found at by the wider
+    # search, or None when the anchor matched or nothing did.
+    if anchor is not None:
+        x1, y1, x2, y2 = anchor
+        window = {'x1': x1 - tolerance, 'y1': y1 - tolerance, 'x2': x2 + tolerance, 'y2': y2 + tolerance}
+        if match_indicator(frame.crop(window, image=frame.bgr), indicator_image, threshold, frame):
+            return True, None
+
+    screen = frame.bgr
+    ox, oy = frame.origin
+    if wide:
+        # Full-screen frames: the indicator sits in the right 20%
+        left = int(screen.shape[1] * 0.8)
+        screen = screen[:, left:]
+        ox += left
+    location = locate_indicator(screen, indicator_image, threshold, frame)
+    if location is None:
+        return False, None
+    height, width = indicator_image.shape[:2]
+    x, y = location[0] + ox, location[1] + oy
+    return True, (x, y, x + width, y + height)
+
+def wait_for_indicator(indicator_image, config, backend, indicator_bbox=None, buffers=None, anchor=None,
+                       should_stop=None):
+    # Polls just the indicator patch, quickly at first and backing off,
+    # until it matches. Returns (seconds it took or None on timeout or
+    # should_stop(), new_anchor as from find_indicator).
+    interval = config.get('inventory_poll_interval', 0.02)
+    max_interval = config.get('inventory_poll_max_interval', 0.1)
+    backoff = config.get('inventory_poll_backoff', 1.5)
+    timeout = config.get('inventory_open_timeout', 1.0)
+    tolerance = config.get('indicator_tolerance', 8)
+    start = time.perf_counter()
+    while True:
+        frame = backend.grab_frame(indicator_bbox, buffers)
+        is_open, new_anchor = find_indicator(frame, indicator_image, config['threshold'], anchor,
+                                             tolerance, wide=indicator_bbox is None)
+        if is_open:
+            return time.perf_counter() - start, new_anchor
+        elapsed = time.perf_counter() - start
+        if elapsed >= timeout or (should_stop is not None and should_stop()):
+            return None, None
+        time.sleep(min(interval, timeout - elapsed))
+        interval = min(interval * backoff, max_interval)
+
+def search_indicator(indicator_image, config, backend, bboxes, buffers=None):
+    # Looks for the indicator in each bbox in turn (None is the whole
+    # screen) without an anchor. Returns where it was found, or None.
+    for bbox in bboxes:
+        frame = backend.grab_frame(bbox, buffers if bbox is not None else None)
+        is_open, new_anchor = find_indicator(frame, indicator_image, config['threshold'], None,
+                                             wide=bbox is None)
+        if is_open:
+            return new_anchor
+    return None
+
+def refresh_anchor(new_anchor):
+    if new_anchor is not None:
+        save_indicator_anchor(new_anchor)
+        print(f"Indicator anchor refreshed to {new_anchor}.")
 
-def ensure_inventory_open(indicator_image, config, max_attempts=3):
+def ensure_inventory_open(indicator_image, config, max_attempts=3, backend=None, bbox=None, buffers=None,
+                          indicator_bbox=None, poll_buffers=None, anchor=None, metrics=NULL_METRICS, inputs=None,
+                          should_stop=None, fallback_bboxes=()):
+    # Returns the frame the inventory was seen open in, so later stages can
+    # reuse it instead of capturing again, or None if it did not open or
+    # should_stop() turned true while waiting. The first time polling after
+    # a key press times out, the indicator is searched for once in
+    # fallback_bboxes (None being the whole screen), which finds it again
+    # when the anchor is stale; later polls then drop the anchor and watch
+    # fallback_bboxes[0] instead.
+    if backend is None:
+        backend = PyAutoGuiBackend()
+    if inputs is None:
+        inputs = create_input_backend()
+    with metrics.span("capture"):
+        frame = backend.grab_frame(bbox, buffers)
+    with metrics.span("color_conversion"):
+        frame.bgr
+    with metrics.span("open_check"):
+        is_open, new_anchor = find_indicator(frame, indicator_image, config['threshold'], anchor,
+                                             config.get('indicator_tolerance', 8), wide=bbox is None)
+    if is_open:
+        refresh_anchor(new_anchor)
+        print("Inventory is open.")
+        return frame
     for attempt in range(max_attempts):
-        screen = np.array(pyautogui.screenshot())
-        screen = cv2.cvtColor(screen, cv2.COLOR_BGR2RGB)
-        if check_inventory_open(screen, indicator_image, config['threshold']):
-            print("Inventory is open.")
-            return True
+        if should_stop is not None and should_stop():
+            print("Drop cancelled.")
+            return None
         print(f"Attempt {attempt + 1}: Inventory not open, pressing key.")
-        pyautogui.press(config['inventory_key'])
-        time.sleep(0.5)
+        inputs.press(config['inventory_key'])
+        with metrics.span("open_check"):
+            start = time.perf_counter()
+            elapsed, new_anchor = wait_for_indicator(indicator_image, config, backend, indicator_bbox,
+                                                     poll_buffers, anchor, should_stop)
+            if elapsed is None and fallback_bboxes and not (should_stop is not None and should_stop()):
+                new_anchor = search_indicator(indicator_image, config, backend, fallback_bboxes, poll_buffers)
+                if new_anchor is not None:
+                    elapsed = time.perf_counter() - start
+                elif anchor is not None:
+                    anchor, indicator_bbox = None, fallback_bboxes[0]
+                fallback_bboxes = ()
+        if elapsed is not None:
+            refresh_anchor(new_anchor)
+            print(f"Inventory opened after {elapsed * 1000:.0f} ms.")
+            with metrics.span("capture"):
+                return backend.grab_frame(bbox, buffers)
     print("Failed to open inventory after max attempts.")
-    return False
+    return None
 
-def search_ga_in_occupied_regions(occupied_regions, ga_image):
-    full_screen = np.array(pyautogui.screenshot())
-    full_screen_gray = cv2.cvtColor(full_screen, cv2.COLOR_BGR2GRAY)
-    ga_image_gray = cv2.cvtColor(ga_image, cv2.COLOR_BGRA2GRAY)
-    ga_found = []
+def convert_frame(frame, backend, bbox=None, buffers=None):
+    # Caches the frame's conversions. A frame viewing the capture ring can
+    # have its slot rewritten before that finishes; it is grabbed again,
+    # then directly from the screen.
+    for grab in (backend.grab_frame, getattr(backend, 'fallback', backend).grab_frame):
+        if frame.convert():
+            return frame
+        frame = grab(bbox, buffers)
+    frame.convert()
+    return frame
 
-    for region in occupied_regions:
-        x1, y1, x2, y2 = region['x1'], max(0, region['y1'] - 20), region['x2'], region['y2']
-        region_image = full_screen_gray[y1:y2, x1:x2]
-        res_ga = cv2.matchTemplate(region_image, ga_image_gray, cv2.TM_CCOEFF_NORMED)
-        _, max_val_ga, _, _ = cv2.minMaxLoc(res_ga)
-        if max_val_ga > 0.51:
-            ga_found.append(region['name'])
+def search_ga_in_occupied_regions(occupied_regions, ga_image_gray, frame=None, pool=None):
+    if frame is None:
+        frame = Frame.grab()
+    found = search_template_in_slots(region_boxes(occupied_regions), ga_image_gray, frame, pool=pool)
+    return [region['name'] for region, hit in zip(occupied_regions, found) if hit]
 
-    return ga_found
+def search_ga_in_grid(occupied_regions, ga_image_gray, frame):
+    found = search_template_in_grid(region_boxes(occupied_regions), ga_image_gray, frame)
+    return [region['name'] for region, hit in zip(occupied_regions, found) if hit]
 
-def main(action):
-    start_time = time.time()
-    config = load_config()
-    indicator_image = cv2.imread('inv.png', cv2.IMREAD_COLOR)
+def parse_action(action):
+    # "dropall", "dropallexcept:<item>,<item>" and "droponly:<item>,<item>",
+    # plus the original GA shortcuts. Returns (mode, items) or None.
+    if action == "dropall":
+        return "except", frozenset()
+    if action == "dropallexceptga":
+        return "except", frozenset(["ga"])
+    if action == "dropgaonly":
+        return "only", frozenset(["ga"])
+    for prefix, mode in (("dropallexcept:", "except"), ("droponly:", "only")):
+        if action.startswith(prefix):
+            items = frozenset(name.strip() for name in action[len(prefix):].split(",") if name.strip())
+            return mode, items
+    return None
 
-    if not ensure_inventory_open(indicator_image, config):
-        return
+# Outcomes of a drop run
+DONE = "done"
+NOTHING_TO_DROP = "nothing to drop"
+INCOMPLETE = "some drops failed"
+CANCELLED = "cancelled"
+NOT_OPEN = "inventory not open"
+FAILED = "failed"
 
-    with open('regions_full.json', 'r') as f_full:
-        regions_full = json.load(f_full)
+# Analysis stages and the stages each one needs
+STAGE_REQUIRES = {
+    "occupancy": (),
+    "item_detection": ("occupancy",),
+    "report": ("occupancy", "item_detection"),
+}
+ALL_STAGES = frozenset(STAGE_REQUIRES)
 
-    ga_image = cv2.imread('ga.png', cv2.IMREAD_UNCHANGED)
-    if ga_image is None:
-        print("Error: Could not load ga.png. Check the file path.")
-        return
+def resolve_stages(wanted):
+    # The wanted stages plus everything they depend on
+    stages = set()
+    pending = list(wanted)
+    while pending:
+        stage = pending.pop()
+        if stage not in stages:
+            stages.add(stage)
+            pending.extend(STAGE_REQUIRES[stage])
+    return frozenset(stages)
 
-    dark_threshold = config.get('threshold', 0.85)
-    occupied_regions = find_occupied_regions(regions_full, dark_threshold)
-    occupied_region_names = [region['name'] for region in occupied_regions]
+def stages_for_action(mode, items, report=False):
+    # Item detection only matters when the action filters on items, so
+    # "dropall" stops at occupancy
+    wanted = ["occupancy"]
+    if items:
+        wanted.append("item_detection")
+    if report:
+        wanted.append("report")
+    return resolve_stages(wanted)
 
-    ga_found = search_ga_in_occupied_regions(occupied_regions, ga_image)
-    occupied_with_ga = [name for name in occupied_region_names if name in ga_found]
-    occupied_without_ga = [name for name in occupied_region_names if name not in ga_found]
-    empty_regions = [region['name'] for region in regions_full if region['name'] not in occupied_region_names]
+def action_mask(mode, items, occupied, item_ids, library):
+    matched = np.isin(item_ids, library.ids(items))
+    if mode == "only":
+        return occupied & matched
+    return occupied & ~matched
+
+def print_analysis_table(grid, occupied, item_ids, library, identify_seconds):
+    # Optional console report (config "report_table"); rich's table module
+    # is only imported when it is switched on.
+    from rich.console import Console
+    from rich.table import Table
+
+    ga = np.isin(item_ids, library.ids({"ga"}))
+    occupied_region_names = grid.names_for(occupied)
+    occupied_with_ga = grid.names_for(occupied & ga)
+    occupied_without_ga = grid.names_for(occupied & ~ga)
+    empty_regions = grid.names_for(~occupied)
 
-    identy_time = time.time()
     console = Console()
     table = Table(title="Inventory Analysis")
     table.add_column("Slots", style="cyan", no_wrap=True)
     table.add_column("Quantity", justify="right", style="green")
     table.add_column("Regions", style="magenta")
 
-    table.add_row("Occupied", str(len(occupied_regions)), ", ".join(occupied_region_names))
+    table.add_row("Occupied", str(len(occupied_region_names)), ", ".join(occupied_region_names))
     table.add_row("Empty", str(len(empty_regions)), ", ".join(empty_regions))
     table.add_row("Occupied with GA", str(len(occupied_with_ga)), ", ".join(occupied_with_ga))
     table.add_row("Occupied w/o GA", str(len(occupied_without_ga)), ", ".join(occupied_without_ga))
-    table.add_row("Time to Identify Slots", f"{(identy_time - start_time):.3f} seconds", "")
+    if len(library) > 1:
+        matched = [f"{grid.names[i]}:{library.name_of(item_ids[i])}" for i in np.flatnonzero(occupied & (item_ids >= 0))]
+        table.add_row("Matched items", str(len(matched)), ", ".join(matched))
+    table.add_row("Time to Identify Slots", f"{identify_seconds:.3f} seconds", "")
 
     console.print(table)
 
-    actions = {
-        "dropall": lambda r: True,
-        "dropallexceptga": lambda r: r['name'] not in ga_found,
-        "dropgaonly": lambda r: r['name'] in ga_found
-    }
+def print_verify_report(grid, clicked, dropped, attempts):
+    retried = [f"{grid.names[i]} ({n} clicks)" for i, n, ok in zip(clicked, attempts, dropped) if ok and n > 1]
+    failed = [grid.names[i] for i, ok in zip(clicked, dropped) if not ok]
+    print(f"[cyan]Verified {len(clicked)} slots: [green]{int(dropped.sum())} dropped[/green][/cyan]")
+    if retried:
+        print(f"[cyan]Dropped after a retry: {', '.join(retried)}[/cyan]")
+    if failed:
+        print(f"[red]Still occupied after {int(attempts[~dropped].max())} clicks: {', '.join(failed)}[/red]")
 
-    if action not in actions:
-        print("Invalid action. Please choose from: dropall, dropallexceptga, dropgaonly")
-        return
+class StreamedTargets:
+    """Click targets that are classified just ahead of being clicked.
+
+    candidates are slot indices in click order. They are handed to
+    select(indices) -> bool mask in chunks that double in size from one,
+    so the first click waits for a single slot's item match and later
+    matches run while the clicks are paced. len() is the current estimate
+    of the number of targets: those selected so far plus the candidates
+    not classified yet. `indices` lists the slots handed out so far.
+    """
+
+    def __init__(self, boxes, candidates, select):
+        self.boxes = boxes
+        self.candidates = candidates
+        self.select = select
+        self.selected = 0
+        self.remaining = len(candidates)
+        self.indices = []
+
+    def __len__(self):
+        return self.selected + self.remaining
+
+    def __iter__(self):
+        start, size = 0, 1
+        while start < len(self.candidates):
+            chunk = self.candidates[start:start + size]
+            hits = chunk[self.select(chunk)]
+            self.remaining -= len(chunk)
+            self.selected += len(hits)
+            start += size
+            size *= 2
+            for index in hits:
+                self.indices.append(index)
+                yield self.boxes[index]
+
+class DropEngine:
+    """Long-lived drop runner that keeps config, assets and buffers warm.
+
+    Config, regions and templates come from the asset cache, so they are
+    only re-read when their files change, and every frame reuses the same
+    preallocated capture, conversion and match buffers.
+    """
+
+    def __init__(self):
+        self.buffers = FrameBuffers()
+        # Indicator polling and verification grab different sizes, keep
+        # them off the main buffers
+        self.poll_buffers = FrameBuffers()
+        self.verify_buffers = FrameBuffers()
+        self.backend = None
+        self.backend_name = None
+        self.capture = None
+        self.shared_backend = None
+        self.inputs = None
+        self.inputs_name = None
+        self.slot_cache = SlotCache()
+        # (count, grid, occupied, item_ids, library) from the last analyze(),
+        # replaced as a whole so other threads can read it without the lock
+        self.latest_analysis = None
+        self.match_pool = None
+        self.metrics = MetricsRecorder(None)
+        # Runs share the buffers, so only one may be in flight at a time
+        self.lock = threading.Lock()
+
+    def get_backend(self, config):
+        name = config.get('capture_backend', 'auto')
+        if self.backend is None or name != self.backend_name:
+            self.backend = create_backend(name)
+            self.backend_name = name
+            self.shared_backend = None
+        if self.capture is not None:
+            # Serve grabs from the capture process, falling back to the
+            # direct backend when its newest frame is too old
+            if self.shared_backend is None:
+                self.shared_backend = SharedFrameBackend(self.capture, self.backend)
+            self.shared_backend.max_age = config.get('capture_max_age', DEFAULT_MAX_AGE)
+            return self.shared_backend
+        return self.backend
+
+    def get_inputs(self, config):
+        name = config.get('input_backend', 'auto')
+        if self.inputs is None or name != self.inputs_name:
+            self.inputs = create_input_backend(name)
+            self.inputs_name = name
+        return self.inputs
+
+    def start_capture(self, config=None):
+        # Starts the capture process for the current calibration's ROI
+        config = config or load_config()
+        grid = load_region_grid('regions_full.json')
+        if not grid:
+            print("Error: Could not load regions_full.json. Run calibration first.")
+            return
+        self.stop_capture(wait=False)
+        bbox = capture_bbox(grid, indicator=load_indicator_anchor())
+        self.capture = CaptureProcess(bbox, config.get('capture_backend', 'auto'),
+                                      config.get('capture_fps', CAPTURE_FPS))
+        self.shared_backend = None
+
+    def stop_capture(self, wait=True):
+        # Detaches the capture process at once; stopping it waits for a run
+        # in progress, which may still hold frames that point into the ring.
+        # With wait=False that happens on a thread, which is returned, so
+        # the GUI thread never blocks on the lock.
+        capture, self.capture, self.shared_backend = self.capture, None, None
+        if capture is None:
+            return None
+
+        def stop():
+            with self.lock:
+                capture.stop()
 
+        if wait:
+            stop()
+            return None
+        thread = threading.Thread(target=stop, name="capture-stop", daemon=True)
+        thread.start()
+        return thread
 
+    def get_match_pool(self, config):
+        pool = MatchPool.from_config(config)
+        if self.match_pool is None or pool.settings() != self.match_pool.settings():
+            if self.match_pool is not None:
+                self.match_pool.close()
+            self.match_pool = pool
+        return self.match_pool
 
-    pyautogui.keyDown('ctrl')
-    for region in filter(actions[action], occupied_regions):
-        x1, y1, x2, y2 = region['x1'], region['y1'], region['x2'], region['y2']
-        click_x = random.randint(x1, x2)
-        click_y = random.randint(y1, y2)
-        pyautogui.click(click_x, click_y)
-        pyautogui.PAUSE = random.uniform(0.1, 0.15)  # Set a random pause
-    pyautogui.keyUp('ctrl')
+    def invalidate_cache(self):
+        # Call after changing thresholds or calibration outside config.json
+        self.slot_cache.invalidate()
 
+    def analyze(self, frame, grid, dark_threshold, library, search_mode, metrics=NULL_METRICS, pool=None,
+                dark_cutoff=DARK_CUTOFF, stages=ALL_STAGES, thresholds=None):
+        # Returns (occupied mask, item id per slot). Only slots whose pixels
+        # changed since the last scan are classified again; the rest reuse
+        # their cached result. Without "item_detection" in stages, occupied
+        # slots that were not classified before get the id UNCLASSIFIED.
+        # thresholds are the per-item ones from library.thresholds().
+        if thresholds is None:
+            thresholds = library.thresholds()
+        cache = self.slot_cache
+        cache.set_context((dark_threshold, dark_cutoff, grid, library, thresholds, search_mode), len(grid))
+        fingerprints = cache.fingerprints_for(frame, grid.boxes)
+        stale = np.flatnonzero(cache.stale(fingerprints))
 
-    end_time = time.time()
-    print(f"[cyan]Total time: [green]{end_time - start_time:.2f} seconds[/green][/cyan]")
+        metrics.count("stale_slots", int(len(stale)))
+        if len(stale):
+            with metrics.span("occupancy"):
+                occupied = classify_occupancy(frame, grid.boxes[stale], dark_threshold, dark_cutoff)
+            item_ids = np.where(occupied, UNCLASSIFIED, -1).astype(np.int32)
+            cache.store(stale, fingerprints[stale], occupied, item_ids)
+        if "item_detection" in stages:
+            self.classify_items(frame, grid, cache.unclassified(), library, search_mode, metrics, pool, thresholds)
+        else:
+            self.publish_analysis(grid, library)
+
+        return cache.occupied.copy(), cache.item_ids.copy()
+
+    def classify_items(self, frame, grid, indices, library, search_mode, metrics=NULL_METRICS, pool=None,
+                       thresholds=None, stage="item_detection"):
+        # Item detection for the given occupied slots, stored in the cache
+        if len(indices):
+            with metrics.span(stage):
+                item_ids = library.classify(grid.boxes[indices], frame, search_mode, pool, thresholds)
+            self.slot_cache.classify_items(indices, item_ids)
+        self.publish_analysis(grid, library)
+
+    def publish_analysis(self, grid, library):
+        count = self.latest_analysis[0] + 1 if self.latest_analysis else 1
+        self.latest_analysis = (count, grid, self.slot_cache.occupied.copy(), self.slot_cache.item_ids.copy(),
+                                library)
+
+    def verify_drops(self, grid, clicked, config, backend, click, scheduler, metrics=NULL_METRICS,
+                     should_stop=None):
+        """Checks that the clicked slots are empty and clicks the rest again.
+
+        Only the bounding box of the slots still being checked is captured,
+        after waiting verify.settle seconds for the game to catch up. Slots
+        still occupied are clicked again up to verify.retries times. The
+        wait is kept longer than the backend's max_age, so a frame from the
+        capture process is always newer than the clicks.
+        Returns (dropped mask, clicks per slot), both aligned with clicked.
+        """
+        verify = config.get('verify', {})
+        retries = verify.get('retries', 2)
+        settle = verify.get('settle', 0.15)
+        max_age = getattr(backend, 'max_age', None)
+        if max_age is not None and settle <= max_age:
+            settle = 2 * max_age
+        dark_threshold = occupancy_threshold(config)
+        dark_cutoff = config.get('dark_cutoff', DARK_CUTOFF)
+
+        clicked = np.asarray(clicked, dtype=np.intp)
+        dropped = np.zeros(len(clicked), dtype=bool)
+        attempts = np.ones(len(clicked), dtype=np.int32)
+        pending = np.arange(len(clicked))
+        for attempt in range(retries + 1):
+            time.sleep(settle)
+            if should_stop is not None and should_stop():
+                break
+            with metrics.span("verify"):
+                boxes = grid.boxes[clicked[pending]]
+                bbox = (int(boxes[:, 0].min()), int(boxes[:, 1].min()),
+                        int(boxes[:, 2].max()), int(boxes[:, 3].max()))
+                frame = convert_frame(backend.grab_frame(bbox, self.verify_buffers), backend, bbox,
+                                      self.verify_buffers)
+                occupied = classify_occupancy(frame, boxes, dark_threshold, dark_cutoff)
+            dropped[pending[~occupied]] = True
+            pending = pending[occupied]
+            if not len(pending) or attempt == retries or (should_stop is not None and should_stop()):
+                break
+            stats = scheduler.execute(grid.boxes[clicked[pending]], click, should_stop)
+            attempts[pending[:stats.clicks]] += 1
+        return dropped, attempts
+
+    def run(self, action, should_stop=None, on_progress=None):
+        # should_stop() is polled between clicks to cancel a run;
+        # on_progress(done, total) reports each click. Returns one of the
+        # run outcomes (DONE, NOTHING_TO_DROP, INCOMPLETE, CANCELLED,
+        # NOT_OPEN, FAILED).
+        with self.lock:
+            config = load_config()
+            self.metrics.path = config.get('metrics_file', METRICS_FILE)
+            run = self.metrics.start_run(action)
+            try:
+                return self._run(action, config, run, should_stop, on_progress)
+            finally:
+                self.metrics.finish_run(run)
+
+    def _run(self, action, config, metrics, should_stop=None, on_progress=None):
+        start_time = time.time()
+        indicator = assets.load_template('inv.png')
+        if indicator is None:
+            print("Error: Could not load inv.png. Check the file path.")
+            return FAILED
+        indicator_image = indicator.bgr
+
+        grid = load_region_grid('regions_full.json')
+        if not grid:
+            print("Error: Could not load regions_full.json. Run calibration first.")
+            return FAILED
+
+        # The action is checked before any input is sent
+        parsed_action = parse_action(action)
+        if parsed_action is None:
+            print("Invalid action. Please choose from: dropall, dropallexceptga, dropgaonly, "
+                  "dropallexcept:<items>, droponly:<items>")
+            return FAILED
+        mode, action_items = parsed_action
+
+        library = load_library()
+        if not library:
+            print("Error: Could not load ga.png or items/manifest.json. Check the file path.")
+            return FAILED
+        unknown = sorted(action_items - set(library.names()))
+        if unknown:
+            print(f"Error: Unknown item(s) in '{action}': {', '.join(unknown)}. "
+                  f"Known items: {', '.join(library.names())}")
+            return FAILED
+
+        backend = self.get_backend(config)
+        inputs = self.get_inputs(config)
+        anchor = load_indicator_anchor()
+        bbox = capture_bbox(grid, indicator=anchor)
+        # If the anchor is stale, look where calibration puts the indicator,
+        # then anywhere on screen
+        fallback_bboxes = (indicator_bbox(grid), None) if anchor is not None else (None,)
+        frame = ensure_inventory_open(indicator_image, config, backend=backend,
+                                      bbox=bbox, buffers=self.buffers,
+                                      indicator_bbox=indicator_bbox(grid, indicator=anchor),
+                                      poll_buffers=self.poll_buffers, anchor=anchor, metrics=metrics,
+                                      inputs=inputs, should_stop=should_stop, fallback_bboxes=fallback_bboxes)
+        if frame is None:
+            return CANCELLED if should_stop is not None and should_stop() else NOT_OPEN
+
+        dark_threshold = occupancy_threshold(config)
+        with metrics.span("color_conversion"):
+            frame = convert_frame(frame, backend, bbox, self.buffers)
+        thresholds = library.thresholds(config.get('item_thresholds'))
+        report = config.get('report_table', False)
+        stages = stages_for_action(mode, action_items, report)
+        search_mode = config.get('ga_search', 'slots')
+        pool = self.get_match_pool(config)
+        # Unless a report needs every item up front, items are matched
+        # while clicking (see StreamedTargets)
+        occupied, item_ids = self.analyze(frame, grid, dark_threshold, library, search_mode, metrics, pool,
+                                          config.get('dark_cutoff', DARK_CUTOFF),
+                                          stages if report else stages - {"item_detection"}, thresholds)
+        metrics.count("occupied", int(occupied.sum()))
+
+        if "report" in stages:
+            print_analysis_table(grid, occupied, item_ids, library, time.time() - start_time)
+
+        with metrics.span("click_planning"):
+            streamed = "item_detection" in stages and not report
+            # While streaming, every occupied slot is a candidate until its
+            # item is known
+            selected = np.flatnonzero(occupied if streamed else
+                                      action_mask(mode, action_items, occupied, item_ids, library))
+            order = order_targets(grid.boxes[selected], config.get('click_order', 'serpentine'),
+                                  inputs.position(), grid.rows[selected])
+            if streamed:
+                def select(indices):
+                    self.classify_items(frame, grid, self.slot_cache.unclassified(indices), library, search_mode,
+                                        metrics, pool, thresholds, stage="streamed_item_detection")
+                    return action_mask(mode, action_items, occupied[indices], self.slot_cache.item_ids[indices],
+                                       library)
+                targets = StreamedTargets(grid.boxes, selected[order], select)
+            else:
+                targets = grid.boxes[selected[order]]
+        scheduler = ClickScheduler(PacingProfile.from_config(config, action))
+        if should_stop is not None and should_stop():
+            print("Drop cancelled.")
+            return CANCELLED
+
+        first_click = []
+        def click(x, y):
+            if not first_click:
+                first_click.append(time.time() - start_time)
+            inputs.click(x, y)
+
+        with metrics.span("click_execution"):
+            with inputs.hold('ctrl'):
+                stats = scheduler.execute(targets, click, should_stop, on_progress)
+        metrics.count("clicks", stats.clicks)
+        if first_click:
+            metrics.count("first_click_ms", round(first_click[0] * 1000, 3))
+            print(f"[cyan]First click after [green]{first_click[0]:.3f} seconds[/green][/cyan]")
+        print(f"[cyan]Clicked {stats.clicks} slots at [green]{stats.clicks_per_second:.1f}[/green] clicks/s[/cyan]")
+        if should_stop is not None and should_stop():
+            outcome = CANCELLED
+        else:
+            outcome = DONE if stats.clicks else NOTHING_TO_DROP
+
+        if config.get('verify', {}).get('enabled', False) and stats.clicks:
+            clicked = (targets.indices if streamed else selected[order])[:stats.clicks]
+            with inputs.hold('ctrl'):
+                dropped, attempts = self.verify_drops(grid, clicked, config, backend, click, scheduler, metrics,
+                                                      should_stop)
+            metrics.count("verify_retries", int((attempts - 1).sum()))
+            metrics.count("verify_failed", int((~dropped).sum()))
+            print_verify_report(grid, clicked, dropped, attempts)
+            if not dropped.all():
+                outcome = INCOMPLETE
+
+        end_time = time.time()
+        print(f"[cyan]Total time: [green]{end_time - start_time:.2f} seconds[/green][/cyan]")
+        return outcome
+
+def watch():
+    # Runs until Ctrl+C, printing events and running the actions bound to
+    # them in config.json
+    from watcher import InventoryWatcher
+
+    engine = DropEngine()
+    watcher = InventoryWatcher(engine, on_event=lambda event: print(f"Watch: {event.kind} {event.value}"),
+                               on_action=engine.run)
+    watcher.start()
+    print("Watching the inventory, press Ctrl+C to stop.")
+    try:
+        while watcher.running:
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    watcher.stop()
+
+def main(action):
+    if action == "watch":
+        watch()
+        return
+    DropEngine().run(action)
 
 if __name__ == '__main__':
     if len(sys.argv) > 1:
         action = sys.argv[1]
         main(action)
     else:
-        print("Please provide an action: dropall, dropallexceptga, dropgaonly")
+        print("Please provide an action: dropall, dropallexceptga, dropgaonly, "
+              "dropallexcept:<items>, droponly:<items>, watch")
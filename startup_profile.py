@@ -0,0 +1,51 @@
+import builtins
+import sys
+import threading
+import time
+
+
+class ImportProfiler:
+    """Records how long each module takes to import the first time.
+
+    Times are inclusive of the module's own imports, like python -X
+    importtime's cumulative column.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.timings = []
+        self._local = threading.local()
+        self._original_import = None
+
+    def install(self):
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._import
+
+    def uninstall(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth + 1
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            self._local.depth = depth
+            self.timings.append((name, depth, time.perf_counter() - start))
+
+    def report(self, label, limit=20, out=sys.stdout):
+        elapsed = time.perf_counter() - self.start
+        print(f"Startup profile: {label} after {elapsed:.3f} seconds", file=out)
+        top_level = sorted((t for t in self.timings if t[1] == 0), key=lambda t: t[2], reverse=True)
+        print("  top-level imports:", file=out)
+        for name, _, seconds in top_level[:limit]:
+            print(f"    {seconds * 1000:8.1f} ms  {name}", file=out)
+        slowest = sorted(self.timings, key=lambda t: t[2], reverse=True)
+        print("  slowest modules (inclusive):", file=out)
+        for name, depth, seconds in slowest[:limit]:
+            print(f"    {seconds * 1000:8.1f} ms  {'  ' * depth}{name}", file=out)
@@ -0,0 +1,25 @@
+from types import SimpleNamespace
+
+import capture
+from capture import MssBackend, QtBackend, create_backend
+
+
+def test_qt_backend_is_kept_in_the_gui_process():
+    assert isinstance(create_backend("qt"), QtBackend)
+
+
+def test_capture_process_replaces_the_qt_backend(monkeypatch, capsys):
+    monkeypatch.setattr(capture, "mss", SimpleNamespace())
+    assert isinstance(create_backend("qt", gui=False), MssBackend)
+    assert "using auto instead" in capsys.readouterr().out
+
+
+def test_qt_grabs_off_the_gui_thread_use_a_thread_safe_backend(monkeypatch):
+    monkeypatch.setattr(capture, "mss", SimpleNamespace())
+    backend = QtBackend()
+    monkeypatch.setattr(backend, "on_gui_thread", lambda: False)
+    grabs = []
+    monkeypatch.setattr(MssBackend, "grab", lambda self, bbox=None, out=None: grabs.append(bbox) or "image")
+    assert backend.grab((0, 0, 10, 10)) == "image"
+    assert grabs == [(0, 0, 10, 10)]
+    assert backend.thread_backend() is backend.thread_backend()
@@ -0,0 +1,92 @@
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from capture import CaptureBackend
+from capture_process import FrameRing, SharedFrameBackend
+from frame import Frame
+from staminka_dropall import convert_frame
+
+BBOX = (100, 200, 140, 230)
+
+
+class DirectBackend(CaptureBackend):
+    """Stands in for the screen: every grab is a flat frame of `value`."""
+
+    name = "direct"
+
+    def __init__(self, value):
+        self.value = value
+        self.grabs = 0
+
+    def grab(self, bbox=None, out=None):
+        self.grabs += 1
+        return np.full((bbox[3] - bbox[1], bbox[2] - bbox[0], 3), self.value, np.uint8)
+
+    def grab_frame(self, bbox=None, buffers=None):
+        return Frame(self.grab(bbox), (bbox[0], bbox[1]), buffers)
+
+
+def publish(ring, value):
+    sequence, out = ring.begin()
+    out[:] = value
+    ring.publish(sequence, time.time())
+
+
+@pytest.fixture
+def ring():
+    ring = FrameRing.create((BBOX[3] - BBOX[1], BBOX[2] - BBOX[0]), slots=2)
+    yield ring
+    ring.close()
+
+
+def shared(ring, fallback):
+    capture = SimpleNamespace(bbox=BBOX, ring=ring, alive=True)
+    return SharedFrameBackend(capture, fallback, max_age=1.0)
+
+
+def test_intact_frame_is_served_from_the_ring(ring):
+    fallback = DirectBackend(200)
+    backend = shared(ring, fallback)
+    publish(ring, 10)
+    frame = convert_frame(backend.grab_frame(BBOX), backend, BBOX)
+    assert fallback.grabs == 0
+    assert (frame.gray == 10).all()
+
+
+def test_overwritten_slot_is_grabbed_again(ring):
+    fallback = DirectBackend(200)
+    backend = shared(ring, fallback)
+    publish(ring, 10)
+    frame = backend.grab_frame(BBOX)
+    # The writer laps the ring before the frame is converted
+    publish(ring, 20)
+    publish(ring, 30)
+    frame = convert_frame(frame, backend, BBOX)
+    assert fallback.grabs == 0
+    assert (frame.gray == 30).all()
+    assert (frame.bgr == 30).all()
+
+
+def test_repeatedly_overwritten_slot_falls_back_to_a_direct_grab(ring):
+    fallback = DirectBackend(200)
+    backend = shared(ring, fallback)
+    publish(ring, 10)
+    # Every ring frame is rewritten before it is converted
+    ring.valid = lambda sequence: False
+    frame = convert_frame(backend.grab_frame(BBOX), backend, BBOX)
+    assert fallback.grabs == 1
+    assert (frame.gray == 200).all()
+
+
+def test_grab_discards_a_copy_of_an_overwritten_slot(ring):
+    fallback = DirectBackend(200)
+    backend = shared(ring, fallback)
+    publish(ring, 10)
+    ring.valid = lambda sequence: False
+    image = backend.grab(BBOX)
+    assert fallback.grabs == 1
+    assert backend.overwritten == 1
+    assert (image == 200).all()
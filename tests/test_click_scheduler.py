@@ -0,0 +1,17 @@
+from click_scheduler import PacingProfile
+
+
+def test_action_settings_override_the_defaults():
+    config = {"pacing": {"default": {"min_gap": 0.2, "jitter": 0.0}, "dropall": {"min_gap": 0.05}}}
+    profile = PacingProfile.from_config(config, "dropall")
+    assert (profile.min_gap, profile.jitter) == (0.05, 0.0)
+
+
+def test_unknown_settings_are_ignored_with_a_warning(capsys):
+    config = {"pacing": {"default": {"min_gap": 0.2, "min_gpa": 0.01}, "dropall": {"burst": 5}}}
+    profile = PacingProfile.from_config(config, "dropall")
+    assert profile.min_gap == 0.2
+    assert profile.burst_size == 0
+    out = capsys.readouterr().out
+    assert "burst, min_gpa" in out
+    assert "burst_size" in out
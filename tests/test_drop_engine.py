@@ -0,0 +1,43 @@
+import json
+
+import cv2
+import numpy as np
+import pytest
+
+import assets
+import staminka_dropall
+from staminka_dropall import DropEngine
+
+
+@pytest.fixture
+def setup(tmp_path, monkeypatch):
+    # Just enough on disk for a run to reach the inventory check
+    assets.cache.invalidate()
+    monkeypatch.chdir(tmp_path)
+    rng = np.random.default_rng(0)
+    cv2.imwrite("inv.png", rng.integers(0, 255, (20, 40, 3), dtype=np.uint8))
+    cv2.imwrite("ga.png", rng.integers(0, 255, (20, 20, 3), dtype=np.uint8))
+    with open("regions_full.json", "w") as f:
+        json.dump([{"name": "a1", "x1": 0, "y1": 40, "x2": 40, "y2": 80}], f)
+    with open("config.json", "w") as f:
+        json.dump({"threshold": 0.85, "inventory_key": "c", "input_backend": "record",
+                   "capture_backend": "file:screen.png"}, f)
+    monkeypatch.setattr(staminka_dropall, "ensure_inventory_open", lambda *args, **kwargs: None)
+
+
+def test_run_reports_failed_setup(tmp_path, monkeypatch):
+    assets.cache.invalidate()
+    monkeypatch.chdir(tmp_path)
+    assert DropEngine().run("dropall") == staminka_dropall.FAILED
+
+
+def test_run_reports_an_unknown_item_as_failed(setup):
+    assert DropEngine().run("droponly:nope") == staminka_dropall.FAILED
+
+
+def test_run_reports_an_inventory_that_did_not_open(setup):
+    assert DropEngine().run("dropall") == staminka_dropall.NOT_OPEN
+
+
+def test_run_reports_a_cancelled_wait(setup):
+    assert DropEngine().run("dropall", should_stop=lambda: True) == staminka_dropall.CANCELLED
@@ -0,0 +1,82 @@
+import cv2
+import numpy as np
+import pytest
+
+from calibration import GRID_COLS, GRID_ROWS
+from frame import Frame
+from grid_detection import _progressions, auto_calibrate, detect_grid
+
+RECT = (400, 300, 400 + GRID_COLS * 52, 300 + GRID_ROWS * 52)
+
+
+def draw_grid(rect=RECT, skip_columns=(), size=(720, 1280)):
+    # Dark screen with light slot borders, 2 px wide like the game's
+    rng = np.random.default_rng(0)
+    gray = rng.integers(10, 30, size, dtype=np.uint8)
+    left, top, right, bottom = rect
+    cell = (right - left) / GRID_COLS
+    for col in range(GRID_COLS + 1):
+        if col in skip_columns:
+            continue
+        x = int(round(left + col * cell))
+        cv2.line(gray, (x, top), (x, bottom), 200, 2)
+    for row in range(GRID_ROWS + 1):
+        y = int(round(top + row * (bottom - top) / GRID_ROWS))
+        cv2.line(gray, (left, y), (right, y), 200, 2)
+    return gray
+
+
+def assert_close(found, expected, tolerance=2):
+    assert found is not None
+    assert np.abs(np.array(found) - np.array(expected)).max() <= tolerance, (found, expected)
+
+
+def test_progression_with_a_missing_line_is_interpolated():
+    positions = np.array([100.0, 150.0, 200.0, 300.0, 350.0])
+    weights = np.ones(len(positions))
+    fits = _progressions(positions, weights, 6, 20, 80)
+    assert fits
+    np.testing.assert_allclose(fits[0], [100, 150, 200, 250, 300, 350])
+
+
+def test_progression_needs_evenly_spaced_lines():
+    positions = np.array([100.0, 130.0, 210.0, 260.0, 400.0])
+    assert _progressions(positions, np.ones(len(positions)), 6, 20, 80) == []
+
+
+def test_detects_an_exact_grid():
+    assert_close(detect_grid(draw_grid()), RECT)
+
+
+@pytest.mark.parametrize("skip", [(3,), (7,)])
+def test_detects_a_grid_with_a_missing_border(skip):
+    assert_close(detect_grid(draw_grid(skip_columns=skip)), RECT)
+
+
+def test_no_grid_on_a_plain_screen():
+    rng = np.random.default_rng(1)
+    assert detect_grid(rng.integers(10, 30, (720, 1280), dtype=np.uint8)) is None
+
+
+def test_no_grid_with_too_few_columns():
+    gray = draw_grid()
+    # Paint over the right half of the grid
+    gray[:, RECT[0] + 6 * 52 + 4:] = 20
+    assert detect_grid(gray) is None
+
+
+def test_rejected_grid_is_not_saved(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    frame = Frame(cv2.cvtColor(draw_grid(), cv2.COLOR_GRAY2RGB))
+    shown = []
+    assert auto_calibrate(frame, "1280x720@1/ui1", confirm=lambda rect: shown.append(rect) or False) is None
+    assert_close(shown[0], RECT)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_accepted_grid_is_saved(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    frame = Frame(cv2.cvtColor(draw_grid(), cv2.COLOR_GRAY2RGB))
+    assert_close(auto_calibrate(frame, "1280x720@1/ui1", confirm=lambda rect: True), RECT)
+    assert (tmp_path / "regions_full.json").exists()
+    assert (tmp_path / "inv.png").exists()
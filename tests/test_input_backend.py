@@ -0,0 +1,78 @@
+import ast
+import os
+
+import pytest
+
+from input_backend import (
+    WINDOWS_VK, X_KEYSYMS, PyAutoGuiInput, RecorderInput, SendInputWindows, canonical_key, split_combo
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Qt's QKeySequence(key).toString(NativeText) for the named keys, lower-cased
+# the way KeybindButton.get_key_names stores them
+QT_KEY_TEXT = [
+    "esc", "tab", "backspace", "return", "enter", "ins", "del", "pause", "print", "sysreq", "home", "end",
+    "left", "up", "right", "down", "pgup", "pgdown", "capslock", "numlock", "scrolllock", "space", "menu",
+] + [f"f{n}" for n in range(1, 25)]
+
+
+def keybind_button_names():
+    # Every name KeybindButton builds itself: the modifiers it appends and
+    # the values of map_key_code_to_name's key_map
+    with open(os.path.join(ROOT, "config_window.py"), "r") as f:
+        tree = ast.parse(f.read())
+    button = next(node for node in tree.body if isinstance(node, ast.ClassDef) and node.name == "KeybindButton")
+    names = set()
+    for node in ast.walk(button):
+        if isinstance(node, ast.Call) and getattr(node.func, "attr", None) == "append" \
+                and getattr(node.func.value, "id", None) == "mods":
+            names.add(node.args[0].value)
+        if isinstance(node, ast.FunctionDef) and node.name == "map_key_code_to_name":
+            key_map = next(n for n in ast.walk(node) if isinstance(n, ast.Dict))
+            names.update(value.value for value in key_map.values)
+    return sorted(names)
+
+
+def test_keybind_button_names_are_found():
+    names = keybind_button_names()
+    assert {"ctrl", "alt", "shift", "cmd", "page_up", "print_screen", "f12"} <= set(names)
+
+
+@pytest.mark.parametrize("name", keybind_button_names() + QT_KEY_TEXT)
+def test_every_keybind_name_has_a_key_code(name):
+    key = canonical_key(name)
+    assert key in WINDOWS_VK
+    assert key in X_KEYSYMS
+
+
+@pytest.mark.parametrize("name", list("ai0,./;[]") + ["I"])
+def test_single_characters_pass_through(name):
+    assert canonical_key(name) == name.lower()
+
+
+def test_unknown_key_falls_back_to_pyautogui():
+    # No virtual-key code: sent through the fallback instead of raising
+    backend = SendInputWindows.__new__(SendInputWindows)
+    backend._fallback = RecorderInput()
+    backend.press("media_play")
+    assert [(kind, args) for _, kind, args in backend._fallback.events] == [
+        ("key_down", ("media_play",)), ("key_up", ("media_play",))
+    ]
+
+
+def test_pyautogui_names():
+    assert PyAutoGuiInput.key_name("page_up") == "pageup"
+    assert PyAutoGuiInput.key_name("PgDown") == "pagedown"
+    assert PyAutoGuiInput.key_name("i") == "i"
+
+
+def test_combinations_release_in_reverse():
+    assert split_combo("ctrl+i") == ["ctrl", "i"]
+    assert split_combo("+") == ["+"]
+    recorder = RecorderInput()
+    recorder.press("ctrl+shift+i")
+    assert [(kind, args[0]) for _, kind, args in recorder.events] == [
+        ("key_down", "ctrl"), ("key_down", "shift"), ("key_down", "i"),
+        ("key_up", "i"), ("key_up", "shift"), ("key_up", "ctrl"),
+    ]
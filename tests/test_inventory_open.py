@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+import staminka_dropall
+from capture import CaptureBackend
+from frame import Frame
+from input_backend import RecorderInput
+
+CONFIG = {"threshold": 0.9, "inventory_key": "c", "inventory_open_timeout": 0.05}
+ANCHOR = (100, 300, 130, 330)
+CAPTURE_BBOX = (80, 280, 150, 350)
+POLL_BBOX = (90, 290, 140, 340)
+CALIBRATED_BBOX = (480, 20, 560, 90)
+
+
+class ScreenBackend(CaptureBackend):
+    """Grabs from a screen image, swapped for `opened` once a key is pressed."""
+
+    name = "screen"
+
+    def __init__(self, screen, opened=None):
+        self.screen = screen
+        self.opened = opened
+        self.bboxes = []
+
+    def grab(self, bbox=None, out=None):
+        self.bboxes.append(bbox)
+        if bbox is None:
+            return self.screen.copy()
+        x1, y1, x2, y2 = bbox
+        return self.screen[y1:y2, x1:x2].copy()
+
+
+class GameInput(RecorderInput):
+    def __init__(self, backend):
+        super().__init__()
+        self.backend = backend
+
+    def key_down(self, key):
+        super().key_down(key)
+        if self.backend.opened is not None:
+            self.backend.screen = self.backend.opened
+
+
+def random_screen(seed):
+    return np.random.default_rng(seed).integers(0, 255, (400, 600, 3), dtype=np.uint8)
+
+
+@pytest.fixture(autouse=True)
+def anchors(monkeypatch):
+    saved = []
+    monkeypatch.setattr(staminka_dropall, "save_indicator_anchor", saved.append)
+    return saved
+
+
+def indicator_at(screen, x, y, size=30):
+    return Frame(screen[y:y + size, x:x + size]).bgr.copy()
+
+
+def open_inventory(indicator, backend, inputs, max_attempts=3):
+    return staminka_dropall.ensure_inventory_open(
+        indicator, CONFIG, max_attempts=max_attempts, backend=backend, bbox=CAPTURE_BBOX,
+        indicator_bbox=POLL_BBOX, anchor=ANCHOR, inputs=inputs, fallback_bboxes=(CALIBRATED_BBOX, None))
+
+
+def key_presses(inputs):
+    return [args for _, kind, args in inputs.events if kind == "key_down"]
+
+
+def test_closed_inventory_opens_without_a_full_screen_grab(anchors):
+    opened = random_screen(0)
+    indicator = indicator_at(opened, *ANCHOR[:2])
+    backend = ScreenBackend(random_screen(1), opened)
+    inputs = GameInput(backend)
+    assert open_inventory(indicator, backend, inputs) is not None
+    assert key_presses(inputs) == [("c",)]
+    assert None not in backend.bboxes
+    assert set(backend.bboxes) == {CAPTURE_BBOX, POLL_BBOX}
+
+
+def test_stale_anchor_recovers_from_the_calibrated_rect(anchors):
+    screen = random_screen(0)
+    indicator = indicator_at(screen, 500, 40)
+    backend = ScreenBackend(screen)
+    inputs = GameInput(backend)
+    assert open_inventory(indicator, backend, inputs) is not None
+    assert anchors == [(500, 40, 530, 70)]
+    assert None not in backend.bboxes
+    assert key_presses(inputs) == [("c",)]
+
+
+def test_stale_anchor_recovers_from_a_full_screen_grab(anchors):
+    screen = random_screen(0)
+    indicator = indicator_at(screen, 520, 200)
+    backend = ScreenBackend(screen)
+    inputs = GameInput(backend)
+    assert open_inventory(indicator, backend, inputs) is not None
+    assert anchors == [(520, 200, 550, 230)]
+    assert backend.bboxes.count(None) == 1
+
+
+def test_wide_search_runs_at_most_once_per_run(anchors):
+    indicator = np.zeros((30, 30, 3), np.uint8)
+    indicator[:15] = 255
+    backend = ScreenBackend(random_screen(0))
+    inputs = GameInput(backend)
+    assert open_inventory(indicator, backend, inputs) is None
+    assert not anchors
+    assert key_presses(inputs) == [("c",)] * 3
+    assert backend.bboxes.count(None) == 1
+    # After giving up on the anchor, polling watches the calibrated rect
+    assert backend.bboxes[-1] == CALIBRATED_BBOX
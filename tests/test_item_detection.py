@@ -0,0 +1,77 @@
+import json
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+import assets
+from frame import Frame
+from item_detection import (
+    PREFILTER_MIN_ITEMS, SLOT_PAD_TOP, Item, ItemLibrary, load_library, search_template_in_grid
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def solid_template(hue, size=(18, 18)):
+    # A striped icon of one hue, so it has texture to match on
+    hsv = np.zeros(size + (3,), dtype=np.uint8)
+    hsv[..., 0] = hue
+    hsv[..., 1] = 220
+    hsv[..., 2] = np.where(np.arange(size[1]) % 4 < 2, 230, 120)[None, :]
+    return assets.Template(cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR))
+
+
+def library_with_ga():
+    ga = assets.Template(cv2.imread(os.path.join(ROOT, "ga.png"), cv2.IMREAD_COLOR))
+    items = [Item("ga", ga)] + [Item(f"other{hue}", solid_template(hue)) for hue in (30, 60, 120)]
+    assert len(items) >= PREFILTER_MIN_ITEMS
+    return ItemLibrary(items), ga
+
+
+@pytest.mark.parametrize("cell", [40, 48, 56, 64])
+def test_prefilter_keeps_ga_in_realistic_slot(cell):
+    library, ga = library_with_ga()
+    rng = np.random.default_rng(cell)
+    # Dark inventory background, one slot with the real ga.png icon
+    screen = rng.integers(0, 40, (SLOT_PAD_TOP + cell + 20, cell + 20, 3), dtype=np.uint8)
+    x1, y1 = 10, SLOT_PAD_TOP + 10
+    box = np.array([[x1, y1, x1 + cell, y1 + cell]], dtype=np.int32)
+    top, left = y1 + (cell - ga.bgr.shape[0]) // 2, x1 + (cell - ga.bgr.shape[1]) // 2
+    screen[top:top + ga.bgr.shape[0], left:left + ga.bgr.shape[1]] = ga.bgr
+    frame = Frame(cv2.cvtColor(screen, cv2.COLOR_BGR2RGB))
+
+    slot_bgr = frame.crop_box(box[0], image=frame.bgr, pad_top=SLOT_PAD_TOP)
+    assert "ga" in [item.name for item in library.candidates(slot_bgr)]
+    assert search_template_in_grid(box, ga.gray, frame)[0]
+    assert library.classify(box, frame, "grid").tolist() == [library.ids({"ga"})[0]]
+
+
+def test_library_reloads_when_an_item_template_changes(tmp_path):
+    items_dir = tmp_path / "items"
+    items_dir.mkdir()
+    manifest = items_dir / "manifest.json"
+    manifest.write_text(json.dumps([{"name": "potion", "file": "potion.png"}]))
+    icon = items_dir / "potion.png"
+    cv2.imwrite(str(icon), solid_template(30).bgr)
+
+    library = load_library(str(manifest))
+    assert load_library(str(manifest)) is library
+
+    # Replace only the PNG; the manifest is untouched
+    cv2.imwrite(str(icon), solid_template(120, size=(20, 20)).bgr)
+    stamp = os.stat(icon).st_mtime_ns + 10 ** 9
+    os.utime(icon, ns=(stamp, stamp))
+    reloaded = load_library(str(manifest))
+    assert reloaded is not library
+    assert reloaded.items[0].template.gray.shape == (20, 20)
+
+
+def test_config_thresholds_leave_the_shared_items_alone():
+    library, _ = library_with_ga()
+    manifest = library.thresholds()
+    overridden = library.thresholds({"ga": 0.9})
+    assert overridden[library.ids({"ga"})[0]] == 0.9
+    assert library.thresholds() == manifest
+    assert [item.threshold for item in library.items] == list(manifest)
@@ -0,0 +1,17 @@
+import time
+
+from metrics import RunMetrics
+
+
+def test_nested_spans_are_not_counted_twice():
+    run = RunMetrics("dropall")
+    with run.span("click_execution"):
+        time.sleep(0.02)
+        with run.span("streamed_item_detection"):
+            time.sleep(0.03)
+        with run.span("streamed_item_detection"):
+            time.sleep(0.03)
+    run.finish()
+    assert 0.06 <= run.stages["streamed_item_detection"] < 0.09
+    assert 0.02 <= run.stages["click_execution"] < 0.05
+    assert sum(run.stages.values()) <= run.total
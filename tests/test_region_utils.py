@@ -0,0 +1,100 @@
+import json
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+import assets
+import calibration
+from frame import Frame, FrameBuffers
+from region_utils import (
+    classify_occupancy, indicator_rect, is_region_empty, load_indicator_anchor, load_region_grid, regions_bbox)
+
+REGIONS = [
+    {"name": "a1", "x1": 0, "y1": 0, "x2": 40, "y2": 40},
+    {"name": "a2", "x1": 40, "y1": 0, "x2": 80, "y2": 40},
+]
+
+
+def write_regions(path, regions):
+    with open(path, "w") as f:
+        json.dump(regions, f)
+
+
+def test_binary_copy_is_written_next_to_the_json_only_when_stale(tmp_path, monkeypatch):
+    assets.cache.invalidate()
+    monkeypatch.chdir(tmp_path)
+    calibration = tmp_path / "calibration"
+    calibration.mkdir()
+    region_file = str(calibration / "regions_full.json")
+    binary_file = calibration / "regions_full.npz"
+    write_regions(region_file, REGIONS)
+
+    grid = load_region_grid(region_file)
+    assert grid.names == ["a1", "a2"]
+    assert binary_file.exists()
+    assert not (tmp_path / "regions_full.npz").exists()
+
+    written = binary_file.stat().st_mtime_ns
+    os.utime(binary_file, ns=(written, written))
+    for _ in range(3):
+        assert load_region_grid(region_file).names == ["a1", "a2"]
+    assert binary_file.stat().st_mtime_ns == written
+
+    # Recalibrating makes the copy stale
+    write_regions(region_file, REGIONS[:1])
+    later = written + 10 ** 9
+    os.utime(region_file, ns=(later, later))
+    assert load_region_grid(region_file).names == ["a1"]
+    assert binary_file.stat().st_mtime_ns != written
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_classify_occupancy_matches_the_per_region_check(seed):
+    rng = np.random.default_rng(seed)
+    height, width = 200, 300
+    # Mostly dark with bright blocks, so dark ratios spread over 0..1
+    rgb = rng.integers(0, 60, (height, width, 3), dtype=np.uint8)
+    for _ in range(20):
+        x, y = rng.integers(0, width - 20), rng.integers(0, height - 20)
+        rgb[y:y + rng.integers(5, 40), x:x + rng.integers(5, 40)] = rng.integers(40, 255, 3, dtype=np.uint8)
+    x1 = rng.integers(0, width - 10, 200)
+    y1 = rng.integers(0, height - 10, 200)
+    boxes = np.stack([x1, y1, x1 + rng.integers(1, 40, 200), y1 + rng.integers(1, 40, 200)], axis=1)
+    boxes[:, 2:] = np.minimum(boxes[:, 2:], (width, height))
+    regions = [{"x1": int(a), "y1": int(b), "x2": int(c), "y2": int(d)} for a, b, c, d in boxes]
+    screen = cv2.cvtColor(rgb, cv2.COLOR_BGR2RGB)
+    for threshold in (0.0, 0.25, 0.5, 0.85, rng.random()):
+        expected = [not is_region_empty(region, screen, threshold) for region in regions]
+        assert classify_occupancy(Frame(rgb), boxes, threshold).tolist() == expected
+        # The buffered path (a frame with FrameBuffers) gives the same answer
+        assert classify_occupancy(Frame(rgb, buffers=FrameBuffers()), boxes, threshold).tolist() == expected
+
+
+def test_unchanged_layout_keeps_its_grid_instance(tmp_path):
+    assets.cache.invalidate()
+    region_file = str(tmp_path / "regions_full.json")
+    write_regions(region_file, REGIONS)
+    from_json = load_region_grid(region_file)
+    # The binary copy written from the JSON is newer, so it is read next
+    later = os.stat(region_file).st_mtime_ns + 10 ** 9
+    os.utime(tmp_path / "regions_full.npz", ns=(later, later))
+    assets.cache.invalidate()
+    assert load_region_grid(region_file) is from_json
+
+    write_regions(region_file, REGIONS[:1])
+    os.utime(region_file, ns=(later + 10 ** 9, later + 10 ** 9))
+    assert load_region_grid(region_file) is not from_json
+
+
+@pytest.mark.parametrize("rect", [(400, 300, 972, 456), (400, 10, 972, 166)])
+def test_indicator_geometry_matches_the_saved_anchor(rect, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calibration.write_calibration(rect)
+    anchor = load_indicator_anchor()
+    assert anchor == calibration.indicator_capture_rect(rect)
+    assert anchor[1] >= 0
+
+    grid = load_region_grid(calibration.REGION_FILE_FULL)
+    assert indicator_rect(grid) == calibration.indicator_capture_rect(regions_bbox(grid))
@@ -0,0 +1,260 @@
+"""Offline analyzer and threshold tuner.
+
+Computes per-slot features for a directory of screenshots in a process
+pool, then sweeps the occupancy and item thresholds against hand labels
+in one vectorized pass and reports the accuracy of every setting.
+
+    python tune.py label SCREENS [--labels labels.json]   # prefill labels
+    python tune.py tune SCREENS [--labels labels.json] [--write]
+
+The labels file maps screenshot file names to {slot name: label}, where
+a label is "empty", "occupied" or an item name (which implies occupied).
+Slots left out of a screenshot's entry are not scored. `label` writes the
+current config's predictions so only the mistakes need fixing by hand.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+CONFIG_FILE = "config.json"
+LABELS_FILE = "labels.json"
+EMPTY = "empty"
+OCCUPIED = "occupied"
+
+CUTOFFS = np.arange(20, 101, 5)
+OCCUPANCY_THRESHOLDS = np.round(np.arange(0.50, 1.0, 0.01), 2)
+ITEM_THRESHOLDS = np.round(np.arange(0.30, 0.96, 0.01), 2)
+
+_boxes = None
+_templates = None
+
+
+def _init_worker(boxes, templates):
+    global _boxes, _templates
+    _boxes = boxes
+    _templates = templates
+
+
+def slot_features(path):
+    """Per-slot features for one screenshot.
+
+    Returns (gray histogram per slot (slots, 256), best match score per
+    item and slot (items, slots), analysis time in ms). Any dark-pixel
+    cutoff can be evaluated from the cumulative histogram afterwards.
+    """
+    import cv2
+    from frame import Frame
+    from item_detection import SLOT_PAD_TOP, match_score
+
+    bgr = cv2.imread(path, cv2.IMREAD_COLOR)
+    if bgr is None:
+        raise RuntimeError(f"Could not load {path}")
+    # Only the grid (plus the match padding above it) is converted
+    x1, y1 = max(0, int(_boxes[:, 0].min())), max(0, int(_boxes[:, 1].min()) - SLOT_PAD_TOP)
+    x2, y2 = int(_boxes[:, 2].max()), int(_boxes[:, 3].max())
+    frame = Frame(cv2.cvtColor(bgr[y1:y2, x1:x2], cv2.COLOR_BGR2RGB), (x1, y1))
+    start = time.perf_counter()
+    gray = frame.gray
+    histograms = np.zeros((len(_boxes), 256), dtype=np.int32)
+    for i, box in enumerate(_boxes):
+        crop = frame.crop_box(box)
+        if crop.size:
+            histograms[i] = cv2.calcHist([crop], [0], None, [256], [0, 256]).ravel()
+    scores = np.full((len(_templates), len(_boxes)), -1.0, dtype=np.float32)
+    for t, template in enumerate(_templates):
+        for i, box in enumerate(_boxes):
+            scores[t, i] = match_score(frame.crop_box(box, gray, pad_top=SLOT_PAD_TOP), template, frame)
+    return histograms, scores, (time.perf_counter() - start) * 1000
+
+
+def extract(paths, boxes, templates, workers=None):
+    # Features for every screenshot, stacked: (frames, slots, 256),
+    # (frames, items, slots) and per-frame ms
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(boxes, templates)) as pool:
+        results = list(pool.map(slot_features, paths, chunksize=max(1, len(paths) // 64)))
+    histograms = np.stack([r[0] for r in results])
+    scores = np.stack([r[1] for r in results])
+    elapsed = np.array([r[2] for r in results])
+    return histograms, scores, elapsed
+
+
+def dark_ratios(histograms, cutoffs):
+    # (cutoffs, frames, slots): share of each slot's pixels below each cutoff
+    cumulative = np.cumsum(histograms, axis=-1)
+    area = cumulative[..., -1].astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (cumulative[..., np.asarray(cutoffs) - 1] / area[..., None]).transpose(2, 0, 1)
+
+
+def sweep_occupancy(ratios, labelled, occupied):
+    # Accuracy for every (cutoff, threshold) pair over the labelled slots.
+    # A slot is occupied unless its dark ratio is above the threshold.
+    ratios = ratios[:, labelled]
+    predicted = ~(ratios[:, None, :] > OCCUPANCY_THRESHOLDS[None, :, None])
+    return (predicted == occupied[labelled]).mean(axis=-1)
+
+
+def sweep_item(scores, labelled, is_item):
+    # Accuracy of "score > threshold" for every item threshold, over slots
+    # labelled occupied
+    scores = scores[labelled]
+    predicted = scores[None, :] > ITEM_THRESHOLDS[:, None]
+    return (predicted == is_item[labelled]).mean(axis=-1)
+
+
+def plateau_center(accuracy):
+    # Index of the best accuracy; among equally good settings the middle
+    # one, which leaves the most room on either side
+    best = np.flatnonzero(accuracy >= accuracy.max() - 1e-12)
+    return int(best[len(best) // 2])
+
+
+def load_setup(args):
+    from item_detection import load_library
+    from region_utils import load_region_grid
+
+    grid = load_region_grid(args.regions)
+    if not grid:
+        raise SystemExit(f"Could not load {args.regions}. Run calibration first.")
+    library = load_library()
+    if not library:
+        raise SystemExit("Could not load ga.png or items/manifest.json.")
+    paths = sorted(glob.glob(os.path.join(args.screens, "*.png")))
+    if not paths:
+        raise SystemExit(f"No screenshots in {args.screens}")
+    return grid, library, paths
+
+
+def read_config():
+    try:
+        with open(CONFIG_FILE, "r") as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return {}
+
+
+def command_label(args):
+    from region_utils import DARK_CUTOFF, occupancy_threshold
+
+    grid, library, paths = load_setup(args)
+    config = read_config()
+    histograms, scores, _ = extract(paths, grid.boxes, [item.template.gray for item in library.items], args.workers)
+    ratios = dark_ratios(histograms, [config.get('dark_cutoff', DARK_CUTOFF)])[0]
+    occupied = ~(ratios > occupancy_threshold(config))
+    thresholds = np.array(library.thresholds(config.get('item_thresholds')), dtype=np.float32)[None, :, None]
+    # First item above its threshold, in library order, as classify does
+    hits = scores > thresholds
+    first = np.where(hits.any(axis=1), hits.argmax(axis=1), -1)
+
+    labels = {}
+    for f, path in enumerate(paths):
+        labels[os.path.basename(path)] = {
+            name: (library.name_of(first[f, i]) if first[f, i] >= 0 else OCCUPIED) if occupied[f, i] else EMPTY
+            for i, name in enumerate(grid.names)
+        }
+    with open(args.labels, "w") as f:
+        json.dump(labels, f, indent=4)
+    print(f"Wrote predictions for {len(paths)} screenshots to {args.labels}; correct them and run 'tune'.")
+    return 0
+
+
+def command_tune(args):
+    grid, library, paths = load_setup(args)
+    with open(args.labels, "r") as f:
+        labels = json.load(f)
+    paths = [path for path in paths if os.path.basename(path) in labels]
+    if not paths:
+        raise SystemExit(f"None of the screenshots in {args.screens} are labelled in {args.labels}")
+
+    # Label matrix over (frames, slots); "" where unlabelled
+    names = np.array([[labels[os.path.basename(path)].get(name, "") for name in grid.names] for path in paths])
+    labelled = names != ""
+    occupied = labelled & (names != EMPTY)
+
+    start = time.perf_counter()
+    histograms, scores, elapsed = extract(paths, grid.boxes, [item.template.gray for item in library.items],
+                                          args.workers)
+    extract_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    occupancy = sweep_occupancy(dark_ratios(histograms, CUTOFFS), labelled, occupied)
+    best_cutoff = plateau_center(occupancy.max(axis=1))
+    best_threshold = plateau_center(occupancy[best_cutoff])
+    item_results = {}
+    for item_id, item in enumerate(library.items):
+        accuracy = sweep_item(scores[:, item_id], occupied, names == item.name)
+        item_results[item.name] = accuracy
+    sweep_seconds = time.perf_counter() - start
+
+    print(f"{len(paths)} screenshots, {int(labelled.sum())} labelled slots")
+    print(f"Features: {extract_seconds:.2f} s ({args.workers or os.cpu_count()} processes), "
+          f"sweep: {sweep_seconds * 1000:.1f} ms")
+    print(f"Per-frame analysis latency: p50 {np.percentile(elapsed, 50):.2f} ms, "
+          f"p95 {np.percentile(elapsed, 95):.2f} ms (the same for every setting)")
+
+    print("\nOccupancy (dark_cutoff x threshold), best per cutoff:")
+    print(f"  {'cutoff':>6} {'threshold':>9} {'accuracy':>9}")
+    for c, cutoff in enumerate(CUTOFFS):
+        t = plateau_center(occupancy[c])
+        marker = "  <- best" if c == best_cutoff else ""
+        print(f"  {cutoff:6d} {OCCUPANCY_THRESHOLDS[t]:9.2f} {occupancy[c, t]:9.3%}{marker}")
+    if args.verbose:
+        for c, cutoff in enumerate(CUTOFFS):
+            row = " ".join(f"{value:.3f}" for value in occupancy[c])
+            print(f"  cutoff {cutoff}: {row}")
+
+    updates = {
+        "dark_cutoff": int(CUTOFFS[best_cutoff]),
+        "occupancy_threshold": float(OCCUPANCY_THRESHOLDS[best_threshold]),
+        "item_thresholds": {},
+    }
+    print("\nItem thresholds:")
+    print(f"  {'item':12} {'threshold':>9} {'accuracy':>9} {'current':>9}")
+    for item in library.items:
+        accuracy = item_results[item.name]
+        best = plateau_center(accuracy)
+        current = accuracy[np.argmin(np.abs(ITEM_THRESHOLDS - item.threshold))]
+        print(f"  {item.name:12} {ITEM_THRESHOLDS[best]:9.2f} {accuracy[best]:9.3%} {current:9.3%}")
+        updates["item_thresholds"][item.name] = float(ITEM_THRESHOLDS[best])
+
+    if args.write:
+        config = read_config()
+        config.update(updates)
+        with open(CONFIG_FILE, "w") as f:
+            json.dump(config, f, indent=4)
+        print(f"\nWrote dark_cutoff, occupancy_threshold and item_thresholds to {CONFIG_FILE}")
+    else:
+        print(f"\nRun with --write to save these to {CONFIG_FILE}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline analyzer and threshold tuner")
+    parser.add_argument("--regions", default="regions_full.json")
+    parser.add_argument("--workers", type=int, default=None, help="feature processes (default: all CPUs)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    label = commands.add_parser("label", help="write current predictions as a labels file")
+    label.add_argument("screens")
+    label.add_argument("--labels", default=LABELS_FILE)
+    label.set_defaults(func=command_label)
+
+    tune = commands.add_parser("tune", help="sweep thresholds against labels")
+    tune.add_argument("screens")
+    tune.add_argument("--labels", default=LABELS_FILE)
+    tune.add_argument("--write", action="store_true", help=f"save the best values to {CONFIG_FILE}")
+    tune.add_argument("--verbose", action="store_true", help="print the whole occupancy grid")
+    tune.set_defaults(func=command_tune)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
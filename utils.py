@@ -3,7 +3,7 @@ import os
 import keyboard
 import sys
 from PyQt5.QtWidgets import QMessageBox, QApplication
-from screen_capture import ScreenCapture
+from screen_capture import ScreenCapture, confirm_grid, screen_calibration_key
 
 CONFIG_FILE = "config.json"
 
@@ -19,8 +19,15 @@ def save_keybind(keybind):
     with open(CONFIG_FILE, "w") as f:
         json.dump(config, f, indent=4)
 
+def auto_calibrate_screen():
+    # Tries to find the grid on the current screen and lets the user check
+    # it before it is saved; None means the manual selection is needed
+    from frame import Frame
+    from grid_detection import auto_calibrate
+    return auto_calibrate(Frame.grab(), screen_calibration_key(), confirm=confirm_grid)
+
 def show_message_and_capture():
-    app = QApplication(sys.argv)
+    app = QApplication.instance() or QApplication(sys.argv)
     msg_box = QMessageBox()
     msg_box.setIcon(QMessageBox.Information)
     msg_box.setWindowTitle("Calibration Needed")
@@ -34,7 +41,11 @@ def show_message_and_capture():
 
     print("Waiting for ALT+BACKSPACE key combination...")
     keyboard.wait('alt+backspace')
-    print("ALT+BACKSPACE detected. Select screen region...")
+    print("ALT+BACKSPACE detected. Looking for the inventory grid...")
+    if auto_calibrate_screen() is not None:
+        print("Calibration finished. Run this program again.")
+        sys.exit(0)
+    print("No grid saved. Select screen region...")
 
     capture_tool = ScreenCapture()
     sys.exit(app.exec_())
@@ -0,0 +1,201 @@
+import threading
+import time
+import cv2
+import numpy as np
+
+import assets
+from frame import FrameBuffers
+from item_detection import load_library
+from region_utils import (DARK_CUTOFF, load_config, load_region_grid, capture_bbox, load_indicator_anchor,
+                          occupancy_threshold)
+from staminka_dropall import convert_frame, find_indicator
+
+DEFAULT_FPS = 5
+# Mean absolute difference (0-255) of the downscaled ROI that counts as a change
+DEFAULT_DIFF_THRESHOLD = 1.5
+DIFF_SCALE = 4
+
+
+class WatchEvent:
+    """Something that changed in the inventory.
+
+    kind is one of "inventory_full", "free_slots" (value: number of free
+    slots), "item_appeared" (value: item name) or "inventory_closed".
+    key is what config bindings are looked up by, e.g. "item_appeared:ga".
+    """
+
+    def __init__(self, kind, value=None):
+        self.kind = kind
+        self.value = value
+
+    @property
+    def key(self):
+        if self.kind == "item_appeared":
+            return f"{self.kind}:{self.value}"
+        return self.kind
+
+    def __repr__(self):
+        return f"WatchEvent({self.kind!r}, {self.value!r})"
+
+
+class WatchStats:
+    def __init__(self):
+        self.frames = 0
+        self.skipped = 0
+        self.analyzed = 0
+        self.busy = 0
+
+
+class InventoryWatcher:
+    """Samples the inventory ROI at a low frame rate and reports changes.
+
+    Each sample is compared against the previous one at 1/DIFF_SCALE
+    resolution; occupancy and item detection only run when the mean
+    difference exceeds diff_threshold. Changes are turned into WatchEvents
+    for on_event, and events bound to an action in config "watch" ->
+    "bindings" (e.g. {"inventory_full": "dropallexceptga"}) are passed to
+    on_action. Samples are skipped while a drop run holds the engine.
+    """
+
+    def __init__(self, engine, on_event=None, on_action=None, backend=None):
+        self.engine = engine
+        self.on_event = on_event
+        self.on_action = on_action
+        self.backend = backend
+        self.buffers = FrameBuffers()
+        self.stats = WatchStats()
+        self._previous = None
+        self._small = None
+        self._state = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="inventory-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def reset(self):
+        # Forget the last frame and state, so the next sample is analyzed
+        # and reports every event afresh
+        self._previous = None
+        self._state = None
+
+    def _loop(self):
+        next_sample = time.perf_counter()
+        while not self._stop.is_set():
+            config = load_config()
+            watch = config.get('watch', {})
+            interval = 1.0 / watch.get('fps', DEFAULT_FPS)
+            try:
+                events = self.sample(config)
+            except Exception as e:
+                print(f"Watch sample failed: {e}")
+                events = []
+            self._dispatch(events, watch.get('bindings', {}))
+
+            # Fixed-rate schedule; if a sample overran, start again from now
+            next_sample += interval
+            now = time.perf_counter()
+            if next_sample < now:
+                next_sample = now + interval
+            self._stop.wait(next_sample - now)
+
+    def _dispatch(self, events, bindings):
+        for event in events:
+            if self.on_event is not None:
+                self.on_event(event)
+            action = bindings.get(event.key)
+            if action and self.on_action is not None:
+                self.on_action(action)
+
+    def changed(self, gray, threshold):
+        height, width = gray.shape[:2]
+        size = (max(1, width // DIFF_SCALE), max(1, height // DIFF_SCALE))
+        if self._small is None or self._small.shape[::-1] != size:
+            self._small = np.empty(size[::-1], dtype=np.uint8)
+            self._previous = None
+        cv2.resize(gray, size, dst=self._small, interpolation=cv2.INTER_AREA)
+        if self._previous is not None:
+            difference = cv2.norm(self._small, self._previous, cv2.NORM_L1) / self._small.size
+            # Compared against the last frame that counted as a change, so
+            # slow fades still add up to one
+            if difference < threshold:
+                return False
+            self._previous[...] = self._small
+        else:
+            self._previous = self._small.copy()
+        return True
+
+    def sample(self, config=None):
+        """Grabs and, if it changed, analyzes one frame. Returns the new events."""
+        config = config or load_config()
+        watch = config.get('watch', {})
+        grid = load_region_grid('regions_full.json')
+        indicator = assets.load_template('inv.png')
+        if not grid or indicator is None:
+            return []
+        anchor = load_indicator_anchor()
+        backend = self.backend or self.engine.get_backend(config)
+        bbox = capture_bbox(grid, indicator=anchor)
+        frame = backend.grab_frame(bbox, self.buffers)
+        self.stats.frames += 1
+
+        if not self.changed(frame.gray, watch.get('diff_threshold', DEFAULT_DIFF_THRESHOLD)):
+            self.stats.skipped += 1
+            return []
+
+        # Drop runs share the slot cache; look again once they are done
+        if not self.engine.lock.acquire(blocking=False):
+            self.stats.busy += 1
+            self._previous = None
+            return []
+        try:
+            frame = convert_frame(frame, backend, bbox, self.buffers)
+            is_open, _ = find_indicator(frame, indicator.bgr, config['threshold'], anchor,
+                                        config.get('indicator_tolerance', 8))
+            if not is_open:
+                return self._update(None)
+            library = load_library()
+            if not library:
+                return []
+            occupied, item_ids = self.engine.analyze(frame, grid, occupancy_threshold(config), library,
+                                                     config.get('ga_search', 'slots'),
+                                                     pool=self.engine.get_match_pool(config),
+                                                     dark_cutoff=config.get('dark_cutoff', DARK_CUTOFF),
+                                                     thresholds=library.thresholds(config.get('item_thresholds')))
+        finally:
+            self.engine.lock.release()
+        self.stats.analyzed += 1
+
+        present = set(int(i) for i in np.unique(item_ids[occupied & (item_ids >= 0)]))
+        return self._update((int((~occupied).sum()), frozenset(library.name_of(i) for i in present)))
+
+    def _update(self, state):
+        # state is (free slots, item names present), or None when closed
+        previous, self._state = self._state, state
+        if state == previous:
+            return []
+        if state is None:
+            return [WatchEvent("inventory_closed")]
+        free, items = state
+        was_free, had_items = previous if previous is not None else (None, frozenset())
+        events = []
+        if free != was_free:
+            events.append(WatchEvent("free_slots", free))
+            if free == 0:
+                events.append(WatchEvent("inventory_full", 0))
+        events.extend(WatchEvent("item_appeared", name) for name in sorted(items - had_items))
+        return events